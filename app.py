@@ -1,21 +1,601 @@
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 import pymongo
-import random
+import click
+from bson import ObjectId
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 import time
+import os
+import threading
+import functools
+import hashlib
+import bisect
+import gzip
+import zlib
+import re
+import json
+import queue
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
+# Encoder JSON optional (pip install orjson)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-app = Flask(__name__)
+# Compresie brotli/zstd optionala (pip install brotli zstandard); gzip e mereu disponibil
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 try:
-    client = pymongo.MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=3000)
-    client.admin.command('ping')
-    db = client["moto_shop_db"]
-    print("✅ Conectat la MongoDB!")
-except Exception as e:
-    print(f"⚠️ ATENȚIE: Nu s-a putut conecta la MongoDB: {e}")
-    db = None
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+app = Flask(__name__)
+
+# JSON RAPID - orjson (C) pentru toate raspunsurile, cu fallback pe json standard
+# MOTO_JSON_ENCODER=std forteaza encoderul standard (comparatii de throughput)
+JSON_ENCODER = "orjson" if orjson is not None and os.environ.get("MOTO_JSON_ENCODER", "auto") != "std" else "std"
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON folosit de jsonify si app.json. Cu orjson, datetime (ISO 8601)
+    si array-urile NumPy se serializeaza nativ; fara orjson, encoderul standard
+    face aceleasi conversii prin default(). Cheile nu se mai sorteaza.
+    """
+    sort_keys = False
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        return DefaultJSONProvider.default(o)
+
+    def encode(self, obj):
+        """
+        Serializare direct in bytes UTF-8 (fara pasul intermediar str)
+        """
+        if JSON_ENCODER == "std":
+            return super().dumps(obj, separators=(",", ":")).encode()
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if JSON_ENCODER == "std" or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if JSON_ENCODER == "std" or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b"\n", mimetype=self.mimetype)
+
+
+app.json = FastJSONProvider(app)
+
+# CONFIGURARE CONEXIUNE - din variabile de mediu
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+DB_NAME = os.environ.get("MONGO_DB", "moto_shop_db")
+# Rutele de analiza pot citi de pe secundare (replica set) ca sa descarce primarul
+ANALYTICS_READ_PREFERENCE = os.environ.get("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred")
+
+READ_PREFERENCES = {
+    "primary": pymongo.ReadPreference.PRIMARY,
+    "primaryPreferred": pymongo.ReadPreference.PRIMARY_PREFERRED,
+    "secondary": pymongo.ReadPreference.SECONDARY,
+    "secondaryPreferred": pymongo.ReadPreference.SECONDARY_PREFERRED,
+    "nearest": pymongo.ReadPreference.NEAREST,
+}
+
+
+def mongo_client_options():
+    """
+    Optiunile MongoClient: pool, timeouts si compresie (MONGO_COMPRESSORS=zstd,snappy
+    necesita pachetele zstandard / python-snappy)
+    """
+    env = os.environ
+    options = {
+        "maxPoolSize": int(env.get("MONGO_MAX_POOL_SIZE", 100)),
+        "minPoolSize": int(env.get("MONGO_MIN_POOL_SIZE", 0)),
+        "serverSelectionTimeoutMS": int(env.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 3000)),
+        "connectTimeoutMS": int(env.get("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+    }
+    if env.get("MONGO_WAIT_QUEUE_TIMEOUT_MS"):
+        options["waitQueueTimeoutMS"] = int(env["MONGO_WAIT_QUEUE_TIMEOUT_MS"])
+    if env.get("MONGO_SOCKET_TIMEOUT_MS"):
+        options["socketTimeoutMS"] = int(env["MONGO_SOCKET_TIMEOUT_MS"])
+    if env.get("MONGO_COMPRESSORS"):
+        options["compressors"] = env["MONGO_COMPRESSORS"]
+    return options
+
+
+class PoolStats(pymongo.monitoring.ConnectionPoolListener):
+    """
+    Statistici pool din evenimentele CMAP (Connection Monitoring and Pooling)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {
+            "pools": 0,
+            "created": 0,
+            "closed": 0,
+            "checked_out": 0,
+            "checkout_failed": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "pool_cleared": 0,
+        }
+
+    def _add(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def pool_created(self, event):
+        self._add("pools")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add("pool_cleared")
+
+    def pool_closed(self, event):
+        self._add("pools", -1)
+
+    def connection_created(self, event):
+        self._add("created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add("checkout_failed")
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.counters["checked_out"] += 1
+            self.counters["in_use"] += 1
+            self.counters["max_in_use"] = max(self.counters["max_in_use"], self.counters["in_use"])
+
+    def connection_checked_in(self, event):
+        self._add("in_use", -1)
+
+
+pool_stats = PoolStats()
+
+
+# METRICS - latenta per ruta + timp in MongoDB, expuse in format Prometheus
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """
+    Registru minimal de metrici (countere, gauge-uri, histograme) cu etichete.
+    O observare = un lock + un bisect, deci overhead neglijabil pe calea critica.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+
+    def inc(self, name, labels=(), value=1):
+        with self.lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge_add(self, name, value, labels=()):
+        with self.lock:
+            key = (name, labels)
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        idx = bisect.bisect_left(LATENCY_BUCKETS, value)
+        with self.lock:
+            key = (name, labels)
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+            hist[0][idx] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    @staticmethod
+    def format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (
+            f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+            for k, v in pairs
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self, extra_gauges=()):
+        """
+        Format text Prometheus (exposition format 0.0.4)
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {k: (list(v[0]), v[1], v[2]) for k, v in self.histograms.items()}
+        for name, labels, value in extra_gauges:
+            gauges[(name, labels)] = value
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{self.format_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{self.format_labels(labels)} {value}")
+        for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{self.format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{self.format_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{self.format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self.format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+METRIC_HELP = {
+    "moto_http_requests_total": "Cereri HTTP per ruta, metoda si status",
+    "moto_http_request_errors_total": "Cereri HTTP terminate cu status 5xx",
+    "moto_http_requests_in_flight": "Cereri HTTP in curs de procesare",
+    "moto_http_request_duration_seconds": "Latenta cererilor HTTP per ruta",
+    "moto_http_request_mongo_seconds": "Timp petrecut in MongoDB per cerere HTTP",
+    "moto_mongo_command_duration_seconds": "Durata comenzilor MongoDB per comanda si colectie",
+    "moto_mongo_command_failures_total": "Comenzi MongoDB esuate",
+    "moto_mongo_pool": "Statistici pool de conexiuni (CMAP)",
+    "moto_mongo_slow_commands_total": "Comenzi MongoDB peste pragul de slow query",
+    "moto_http_compression_bytes_in_total": "Bytes inainte de compresia raspunsurilor",
+    "moto_http_compression_bytes_out_total": "Bytes trimisi dupa compresia raspunsurilor",
+    "moto_http_compression_saved_bytes_total": "Bytes economisiti prin compresie",
+    "moto_http_compression_cpu_seconds_total": "Timp CPU petrecut in compresie",
+    "moto_http_compression_skipped_total": "Raspunsuri necomprimate (sub prag sau tip necompresibil)",
+}
+
+metrics = Metrics()
+
+# Cererea HTTP curenta (ruta, start, timp MongoDB) pentru listener-ul de comenzi.
+# ContextVar, nu flask.g: acelasi mecanism serveste si view-urile async din asgi_app.py
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def begin_request_metrics(route):
+    metrics.gauge_add("moto_http_requests_in_flight", 1)
+    stats = {"route": route, "start": time.perf_counter(), "mongo_seconds": 0.0, "mongo_commands": 0, "recorded": False}
+    stats["token"] = current_request.set(stats)
+
+
+def record_response_metrics(method, response):
+    """
+    Latenta, status si timpul MongoDB ale cererii curente + antetul Server-Timing
+    """
+    stats = current_request.get()
+    elapsed = time.perf_counter() - stats["start"]
+    route = stats["route"]
+    metrics.inc("moto_http_requests_total", (("route", route), ("method", method), ("status", response.status_code)))
+    if response.status_code >= 500:
+        metrics.inc("moto_http_request_errors_total", (("route", route), ("method", method)))
+    metrics.observe("moto_http_request_duration_seconds", elapsed, (("route", route), ("method", method)))
+    metrics.observe("moto_http_request_mongo_seconds", stats["mongo_seconds"], (("route", route),))
+    response.headers["Server-Timing"] = (
+        f"app;dur={elapsed * 1000:.2f}, mongo;dur={stats['mongo_seconds'] * 1000:.2f};"
+        f"desc=\"{stats['mongo_commands']} cmd\""
+    )
+    stats["recorded"] = True
+
+
+def end_request_metrics(method, error):
+    stats = current_request.get()
+    if stats is not None:
+        current_request.reset(stats["token"])
+    metrics.gauge_add("moto_http_requests_in_flight", -1)
+    # O exceptie netratata trece si prin after_request (cu raspunsul 500), care a
+    # numarat deja eroarea; aici numaram doar cererile care nu au ajuns acolo
+    if error is not None and stats is not None and not stats["recorded"]:
+        metrics.inc("moto_http_request_errors_total", (("route", stats["route"]), ("method", method)))
+
+
+# SLOW QUERIES - comenzi peste prag, grupate dupa forma (fara valori literale)
+SLOW_QUERY_MS = float(os.environ.get("MOTO_SLOW_QUERY_MS", "100"))  # < 0 dezactiveaza
+SLOW_QUERY_EXPLAIN = os.environ.get("MOTO_SLOW_QUERY_EXPLAIN", "0") == "1"
+SLOW_QUERY_COLLECTION = "slow_queries"
+SLOW_QUERY_LOG_BYTES = 8 * 1024 * 1024
+SLOW_QUERY_QUEUE_SIZE = 1000
+
+# Campurile din comanda care dau forma interogarii
+SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("query",),
+    "findAndModify": ("query", "sort", "update"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+}
+
+# Campuri de sesiune/transport scoase din comanda inainte de explain
+COMMAND_META_FIELDS = {
+    "$db", "lsid", "$clusterTime", "$readPreference", "txnNumber", "signature",
+    "readConcern", "writeConcern", "startTransaction", "autocommit"
+}
+
+
+def query_shape(value):
+    """
+    Forma unei interogari: operatorii, campurile si referintele "$camp" raman,
+    valorile literale devin "?" - {"price": {"$gt": 10000}} -> {"price": {"$gt": "?"}}
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = query_shape(item)
+            if not shapes or shapes[-1] != shape:  # $in: [a, b, c] -> ["?"]
+                shapes.append(shape)
+        return shapes
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def docs_returned(reply):
+    """
+    Documente intoarse de comanda (primul batch al cursorului, valorile distinct sau n)
+    """
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "values" in reply:
+        return len(reply["values"])
+    return reply.get("n")
+
+
+def plan_stages(explain):
+    """
+    Etapele planului castigator dintr-un explain (find sau aggregate)
+    """
+    planner = explain.get("queryPlanner")
+    if planner is None:  # aggregate: planul e in prima etapa ($cursor)
+        first = (explain.get("stages") or [{}])[0]
+        planner = first.get("$cursor", {}).get("queryPlanner", {})
+    plan = planner.get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)  # Formatul SBE (MongoDB 7+)
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage")
+    return " <- ".join(stage for stage in stages if stage)
+
+
+class SlowQueryLog:
+    """
+    Comenzile lente sunt puse intr-o coada si scrise de un thread de fundal in
+    colectia capped slow_queries - listener-ul nu face I/O pe calea cererii.
+    Cu MOTO_SLOW_QUERY_EXPLAIN=1, fiecare forma noua primeste un explain
+    (queryPlanner) la prima aparitie.
+    """
+
+    def __init__(self, threshold_ms, explain):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.queue = queue.Queue(maxsize=SLOW_QUERY_QUEUE_SIZE)
+        self.explained = set()
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.writer = None
+        self.collection_ready = False
+
+    def record(self, command_name, collection, command, reply, duration_ms):
+        if collection == SLOW_QUERY_COLLECTION or command_name == "explain":
+            return
+        shape = {field: query_shape(command[field]) for field in SHAPE_FIELDS.get(command_name, ()) if field in command}
+        shape_text = json.dumps(shape, default=str)
+        shape_hash = hashlib.md5(f"{command_name}:{collection}:{shape_text}".encode()).hexdigest()[:16]
+        stats = current_request.get()
+        route = stats["route"] if stats is not None else "background"
+        entry = {
+            "ts": datetime.now(),
+            "route": route,
+            "command": command_name,
+            "collection": collection,
+            "shape_hash": shape_hash,
+            "shape": shape_text,
+            "duration_ms": round(duration_ms, 2),
+            "docs_returned": docs_returned(reply)
+        }
+
+        explain_command = None
+        if self.explain and command_name in SHAPE_FIELDS:
+            with self.lock:
+                if shape_hash not in self.explained:
+                    self.explained.add(shape_hash)
+                    explain_command = {k: v for k, v in command.items() if k not in COMMAND_META_FIELDS}
+
+        self.ensure_writer()
+        try:
+            self.queue.put_nowait((entry, explain_command))
+        except queue.Full:
+            self.dropped += 1
+
+    def ensure_writer(self):
+        if self.writer is None:
+            with self.lock:
+                if self.writer is None:
+                    self.writer = threading.Thread(target=self.drain, name="slow-query-log", daemon=True)
+                    self.writer.start()
+
+    def drain(self):
+        while True:
+            entry, explain_command = self.queue.get()
+            # Colectia capped se creeaza inainte de primul insert: altfel insert_one ar
+            # crea-o implicit ca colectie obisnuita (migrarile si indexurile de la
+            # startup sunt primele comenzi lente)
+            if not self.collection_ready:
+                try:
+                    ensure_slow_query_log()
+                    self.collection_ready = True
+                except Exception as e:
+                    self.dropped += 1
+                    print(f"⚠️ Slow query log: {e}")
+                    continue
+            if explain_command is not None:
+                try:
+                    entry["explain"] = plan_stages(db.command("explain", explain_command, verbosity="queryPlanner"))
+                except Exception as e:
+                    entry["explain"] = f"Eroare: {e}"
+            try:
+                db[SLOW_QUERY_COLLECTION].insert_one(entry)
+            except Exception as e:  # thread-ul de scriere nu trebuie sa moara
+                print(f"⚠️ Slow query log: {e}")
+
+
+def ensure_slow_query_log():
+    """
+    Colectie capped: cele mai vechi intrari se suprascriu, fara TTL sau curatare.
+    Apelata de thread-ul de scriere inainte de primul insert.
+    """
+    try:
+        if SLOW_QUERY_COLLECTION not in db.list_collection_names():
+            try:
+                db.create_collection(SLOW_QUERY_COLLECTION, capped=True, size=SLOW_QUERY_LOG_BYTES)
+            except pymongo.errors.CollectionInvalid:
+                pass  # creata intre timp de alt worker
+        elif not db[SLOW_QUERY_COLLECTION].options().get("capped"):
+            # creata implicit (necapped) de un insert mai vechi - o convertim
+            db.command("convertToCapped", SLOW_QUERY_COLLECTION, size=SLOW_QUERY_LOG_BYTES)
+    except pymongo.errors.OperationFailure as e:
+        # ex: deployment-uri fara colectii capped - log-ul devine colectie obisnuita
+        print(f"⚠️ slow_queries nu poate fi capped: {e}")
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN)
+
+
+class CommandMetrics(pymongo.monitoring.CommandListener):
+    """
+    Masoara fiecare comanda MongoDB (nume, colectie, durata) si aduna timpul
+    la cererea HTTP curenta. Callback-urile ruleaza pe thread-ul (sau task-ul
+    async) care executa comanda, deci current_request este cel al cererii
+    care a declansat-o.
+    """
+
+    def __init__(self):
+        self.pending = {}
+
+    def started(self, event):
+        command = event.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self.pending[event.request_id] = (event.command_name, collection, command)
+
+    def _finish(self, event, failed):
+        command_name, collection, command = self.pending.pop(event.request_id, (event.command_name, "", {}))
+        seconds = event.duration_micros / 1e6
+        labels = (("command", command_name), ("collection", collection))
+        metrics.observe("moto_mongo_command_duration_seconds", seconds, labels)
+        if failed:
+            metrics.inc("moto_mongo_command_failures_total", labels)
+        elif 0 <= slow_query_log.threshold_ms <= seconds * 1000:
+            metrics.inc("moto_mongo_slow_commands_total", labels)
+            slow_query_log.record(command_name, collection, command, event.reply, seconds * 1000)
+        stats = current_request.get()
+        if stats is not None:
+            stats["mongo_seconds"] += seconds
+            stats["mongo_commands"] += 1
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+command_metrics = CommandMetrics()
+
+
+@app.before_request
+def start_request_timer():
+    begin_request_metrics(request.url_rule.rule if request.url_rule else "unmatched")
+
+
+@app.after_request
+def record_request_metrics(response):
+    record_response_metrics(request.method, response)
+    return response
+
+
+@app.teardown_request
+def end_request_timer(error):
+    end_request_metrics(request.method, error)
+
+
+@app.route('/metrics')
+def metrics_route():
+    """
+    Endpoint Prometheus (text/plain, format 0.0.4)
+    """
+    pool = [("moto_mongo_pool", (("stat", name),), value) for name, value in pool_stats.snapshot().items()]
+    return Response(metrics.render(pool), mimetype="text/plain; version=0.0.4")
+
+# Clientul nu se conecteaza la import (connect=False): prima operatie deschide
+# conexiunea, deci pornirea unui worker nu asteapta dupa MongoDB
+client = pymongo.MongoClient(
+    MONGO_URI, event_listeners=[pool_stats, command_metrics], connect=False, **mongo_client_options()
+)
+db = client[DB_NAME]
+analytics_db = client.get_database(
+    DB_NAME, read_preference=READ_PREFERENCES[ANALYTICS_READ_PREFERENCE]
+)
 
 HTML_INTERFACE = """
 <!DOCTYPE html>
@@ -500,7 +1080,7 @@ HTML_INTERFACE = """
         async function loadProducts() {
             try {
                 const res = await fetch('/api/products');
-                const products = await res.json();
+                const products = (await res.json()).items;
                 document.getElementById('product-count').textContent = products.length + ' produse in catalog';
                 
                 document.getElementById('products-grid').innerHTML = products.map(p => {
@@ -858,6 +1438,7 @@ HTML_INTERFACE = """
                 document.getElementById('results-container').innerHTML = `
                     <div class="result-box">
                         <h3>Test Performanta Indexare</h3>
+                        <p style="color:#666; margin-bottom:10px;">${data.docs.toLocaleString()} documente, latenta p50</p>
                         <div class="result-item">
                             <span>Fara index</span>
                             <strong style="color:#e74c3c;">${data.without_index.time} ms</strong>
@@ -1076,281 +1657,2079 @@ db.products.insertOne({...}, { writeConcern: { w: "majority" } })
 """
 
 
-def migrate_user_addresses():
+MIGRATION_BATCH_SIZE = 1000
+
+# Conversia address -> addresses facuta pe server (update cu pipeline):
+# documentele nu mai trec prin Python, un batch = un singur update_many
+ADDRESS_MIGRATION_PIPELINE = [
+    {"$set": {
+        "addresses": {"$ifNull": ["$addresses", [{
+            "label": "Acasa",
+            "city": {"$ifNull": ["$address.city", ""]},
+            "street": {"$ifNull": ["$address.street", ""]},
+            "zip": {"$ifNull": ["$address.zip", ""]}
+        }]]}
+    }},
+    {"$unset": "address"}
+]
+
+
+def migrate_user_addresses(name, dry_run=False, batch_size=MIGRATION_BATCH_SIZE):
     """
     Migreaza utilizatorii vechi de la address (singular) la addresses (array)
+
+    Parcurge utilizatorii in ordinea _id, in batch-uri de batch_size, si salveaza
+    ultimul _id procesat (checkpoint) dupa fiecare batch - o migrare intrerupta
+    continua de unde a ramas. dry_run=True doar numara documentele afectate.
     """
-    try:
-        if db is None:
-            return
-        
-        users_to_migrate = db.users.find({
-            "address": {"$exists": True},
-            "addresses": {"$exists": False}
-        })
-        
-        for user in users_to_migrate:
-            old_address = user.get('address', {})
-            new_addresses = [{
-                "label": "Acasa",
-                "city": old_address.get('city', ''),
-                "street": old_address.get('street', ''),
-                "zip": old_address.get('zip', '')
-            }]
-            
-            db.users.update_one(
-                {"_id": user['_id']},
-                {
-                    "$set": {"addresses": new_addresses},
-                    "$unset": {"address": ""}
-                }
-            )
-        
-        db.users.update_many(
-            {"address": {"$exists": True}},
-            {"$unset": {"address": ""}}
+    legacy = {"address": {"$exists": True}}
+    if dry_run:
+        return {"dry_run": True, "would_migrate": db.users.count_documents(legacy)}
+
+    state = db.migrations.find_one({"_id": name}) or {}
+    last_id = state.get("checkpoint")
+    migrated = state.get("migrated", 0)
+    batches = 0
+    start = time.perf_counter()
+
+    while True:
+        batch_filter = dict(legacy)
+        if last_id is not None:
+            batch_filter["_id"] = {"$gt": last_id}
+        ids = [u["_id"] for u in db.users.find(batch_filter, {"_id": 1}).sort("_id", 1).limit(batch_size)]
+        if not ids:
+            break
+
+        result = db.users.update_many({"_id": {"$in": ids}}, ADDRESS_MIGRATION_PIPELINE)
+        last_id = ids[-1]
+        migrated += result.modified_count
+        batches += 1
+        # started_at este si heartbeat-ul lock-ului: o migrare lunga care inca
+        # avanseaza nu este preluata de alt worker dupa MIGRATION_LOCK_TIMEOUT
+        db.migrations.update_one(
+            {"_id": name},
+            {"$set": {"checkpoint": last_id, "migrated": migrated, "started_at": datetime.now()}}
         )
-        
-        print("Migrare adrese completata!")
-    except Exception as e:
-        print(f"Eroare la migrare: {e}")
 
-migrate_user_addresses()
+    seconds = time.perf_counter() - start
+    report = {
+        "migrated": migrated,
+        "batches": batches,
+        "seconds": round(seconds, 2),
+        "docs_per_sec": round(migrated / seconds) if seconds > 0 and migrated else None
+    }
+    print(f"Migrare adrese completata: {report}")
+    return report
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_INTERFACE)
 
-@app.route('/api/stats')
-def get_stats():
+# Codurile vechi ORD-<5 cifre> se repeta; grupurile de duplicate (pastram
+# primul document dupa _id) se calculeaza pe server
+DUPLICATE_ORDER_CODES_PIPELINE = [
+    {"$sort": {"_id": 1}},
+    {"$group": {"_id": "$order_code", "orders": {"$push": {"_id": "$_id", "date": "$date"}}, "count": {"$sum": 1}}},
+    {"$match": {"count": {"$gt": 1}}},
+]
+
+
+def migrate_order_codes(name, dry_run=False, batch_size=MIGRATION_BATCH_SIZE):
     """
-    Folosim Aggregation Pipeline pentru a calcula statistici în baza de date,
-    nu în Python. Acest lucru este mult mai eficient pentru dataset-uri mari.
+    Rescrie codurile de comanda duplicate (format vechi) cu new_order_code(),
+    inainte de crearea indexului unic pe orders.order_code. Primul document din
+    fiecare grup isi pastreaza codul. Reluabila: o rulare intrerupta gaseste
+    doar duplicatele ramase.
     """
-    try:
-        total_products = db.products.count_documents({})
-        
-        total_orders = db.orders.count_documents({})
-        
-        revenue_pipeline = [
-            {"$group": {"_id": None, "total": {"$sum": "$price_snapshot"}}}
-        ]
-        revenue_result = list(db.orders.aggregate(revenue_pipeline))
-        total_revenue = revenue_result[0]["total"] if revenue_result else 0
-        
-        avg_pipeline = [
-            {"$group": {"_id": None, "avg": {"$avg": "$price"}}}
-        ]
-        avg_result = list(db.products.aggregate(avg_pipeline))
-        avg_price = round(avg_result[0]["avg"], 0) if avg_result else 0
-        
-        return jsonify({
-            "total_products": total_products,
-            "total_orders": total_orders,
-            "total_revenue": total_revenue,
-            "avg_price": avg_price
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    groups = db.orders.aggregate(DUPLICATE_ORDER_CODES_PIPELINE, allowDiskUse=True)
+    if dry_run:
+        return {"dry_run": True, "would_migrate": sum(group["count"] - 1 for group in groups)}
 
-@app.route('/api/products')
-def get_products():
+    migrated = 0
+    batches = 0
+    start = time.perf_counter()
+    ops = []
+    for group in groups:
+        for order in group["orders"][1:]:
+            ops.append(pymongo.UpdateOne(
+                {"_id": order["_id"]},
+                {"$set": {"order_code": new_order_code(when=order.get("date")), "legacy_order_code": group["_id"]}}
+            ))
+        if len(ops) >= batch_size:
+            migrated += db.orders.bulk_write(ops, ordered=False).modified_count
+            batches += 1
+            ops = []
+            db.migrations.update_one({"_id": name}, {"$set": {"migrated": migrated, "started_at": datetime.now()}})
+    if ops:
+        migrated += db.orders.bulk_write(ops, ordered=False).modified_count
+        batches += 1
+
+    seconds = time.perf_counter() - start
+    report = {"migrated": migrated, "batches": batches, "seconds": round(seconds, 2)}
+    print(f"Migrare coduri comanda completata: {report}")
+    return report
+
+
+def migrate_sales_daily(name, dry_run=False):
     """
-    CRUD: READ - Citim produsele din MongoDB
-    Folosim projection pentru a exclude _id (nu e serializabil în JSON direct)
+    Construieste rollup-ul sales_daily pe o baza existenta (altfel /api/top-sales
+    cu from/to si /api/monthly-stats ar fi goale pana la un backfill manual)
     """
-    try:
-        prods = list(db.products.find({}, {'_id': 0}).limit(50))
-        return jsonify(prods)
-    except Exception as e:
-        return jsonify({"error": "Eroare la citirea produselor", "details": str(e)}), 500
+    if dry_run:
+        return {"dry_run": True, "orders": db.orders.estimated_document_count()}
+    start = time.perf_counter()
+    rows = backfill_sales_daily()
+    invalidate_cache("orders")
+    return {"rows": rows, "seconds": round(time.perf_counter() - start, 2)}
 
-@app.route('/api/init', methods=['POST'])
-def init_db_route():
+
+# MIGRARI - rulate o singura data, indiferent cati workeri pornesc
+# Ruleaza inainte de ensure_indexes (ex: duplicatele ar bloca indexul unic pe order_code)
+MIGRATIONS = [
+    ("user_addresses_v1", migrate_user_addresses),
+    ("order_codes_unique_v1", migrate_order_codes),
+    ("sales_daily_v1", migrate_sales_daily),
+]
+MIGRATION_LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def acquire_migration(name):
     """
-    CRUD: DELETE + CREATE
-    Ștergem colecțiile existente și generăm date noi
-    Demonstrează Flexible Schema - specs diferite per produs
+    Documentul din colectia migrations este lock-ul, versiunea si checkpoint-ul:
+    - nu exista                     -> il cream (insert atomic pe _id) si rulam migrarea
+    - status "done"                 -> migrarea a rulat deja
+    - "failed" sau "running" expirat -> preluam lock-ul si continuam de la checkpoint
     """
+    now = datetime.now()
     try:
-        db.products.drop()
-        db.orders.drop()
-        db.users.drop()
-        
-        products = []
-        brands = ["Yamaha", "Honda", "Ducati", "BMW", "KTM", "Kawasaki", "Harley-Davidson"]
-        types = ["Sport", "Naked", "Adventure", "Cruiser", "Enduro"]
-        colors = ["Red", "Black", "Blue", "White", "Matte Black", "Orange"]
-        
-        for i in range(30):
-            brand = random.choice(brands)
-            moto_type = random.choice(types)
-            cc = random.choice([300, 600, 750, 1000, 1200])
-            
-            products.append({
-                "moto_id": f"M{i+100}",
-                "name": f"{brand} {moto_type} {cc}",
-                "brand": brand,  # Adăugăm brand separat pentru aggregation
-                "type": moto_type,
-                "cc": cc,
-                "price": 5000 + (cc * 8) + random.randint(-500, 2000),
-                "stock": random.randint(0, 8),
-                "color": random.choice(colors),
-                "specs": {
-                    "weight_kg": random.randint(150, 280),
-                    "fuel_tank_l": random.randint(12, 25),
-                    "warranty_years": random.choice([1, 2, 3])
-                },
-                "vector_embedding": np.random.rand(5).tolist(),
-                "created_at": datetime.now()
-            })
-        
-        db.products.insert_many(products)
-        
-        users = []
-        cities = ["Bucuresti", "Cluj-Napoca", "Timisoara", "Iasi", "Constanta"]
-        streets = ["Str. Libertatii", "Bd. Unirii", "Calea Victoriei", "Str. Mihai Eminescu", "Aleea Rozelor"]
-        labels = ["Acasa", "Birou", "Parinti"]
-        
-        for i in range(5):
-            num_addresses = random.randint(1, 3)
-            addresses = []
-            for j in range(num_addresses):
-                addresses.append({
-                    "label": labels[j],
-                    "city": random.choice(cities),
-                    "street": f"{random.choice(streets)} {random.randint(1, 100)}",
-                    "zip": f"{random.randint(100000, 999999)}"
-                })
-            
-            users.append({
-                "user_id": f"U{i+1}",
-                "name": f"Client {i+1}",
-                "email": f"client{i+1}@motoshop.ro",
-                "addresses": addresses,
-                "created_at": datetime.now()
-            })
-        db.users.insert_many(users)
-        
-        db.products.create_index("price")
-        db.products.create_index("brand")
-        db.products.create_index("moto_id")
-        
-        return jsonify({
-            "status": "ok", 
-            "products_count": len(products),
-            "users_count": len(users)
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        db.migrations.insert_one({"_id": name, "status": "running", "started_at": now})
+        return True
+    except pymongo.errors.DuplicateKeyError:
+        taken = db.migrations.find_one_and_update(
+            {"_id": name, "$or": [
+                {"status": "failed"},
+                {"status": "running", "started_at": {"$lt": now - MIGRATION_LOCK_TIMEOUT}}
+            ]},
+            {"$set": {"status": "running", "started_at": now}}
+        )
+        return taken is not None
 
-@app.route('/api/buy', methods=['POST'])
-def buy_route():
+
+def run_migrations(force=False, dry_run=False):
     """
-    CRUD: UPDATE (stoc) + CREATE (comandă)
-    Folosim SNAPSHOT PATTERN - copiem prețul la momentul comenzii
-    Folosim REFERENCING - customer_ref către user
+    Ruleaza migrarile neaplicate; force=True le reruleaza de la zero (comanda CLI)
+    dry_run=True raporteaza ce s-ar modifica, fara lock si fara scrieri
     """
-    try:
-        data = request.json
-        moto_id = data.get('id')
-        
-        if not moto_id:
-            return jsonify({"success": False, "message": "ID produs lipsă!"})
-        
-        prod = db.products.find_one({"moto_id": moto_id})
-        
-        if not prod:
-            return jsonify({"success": False, "message": "Produs inexistent!"})
-        
-        if prod['stock'] <= 0:
-            return jsonify({"success": False, "message": "Stoc epuizat!"})
-        
-        result = db.products.update_one(
-            {"moto_id": moto_id, "stock": {"$gt": 0}},  # Verificare atomică
-            {"$inc": {"stock": -1}}
+    report = {}
+    for name, migration in MIGRATIONS:
+        if dry_run:
+            report[name] = migration(name, dry_run=True)
+            continue
+        if force:
+            db.migrations.delete_one({"_id": name})
+        if not acquire_migration(name):
+            report[name] = "skipped"
+            continue
+        try:
+            result = migration(name)
+        except Exception as e:
+            # Eliberam lock-ul, pastram checkpoint-ul: urmatoarea pornire continua
+            db.migrations.update_one({"_id": name}, {"$set": {"status": "failed", "error": str(e)}})
+            print(f"Eroare la migrare {name}: {e}")
+            report[name] = f"failed: {e}"
+            continue
+        db.migrations.update_one(
+            {"_id": name},
+            {"$set": {"status": "done", "finished_at": datetime.now(), "report": result}}
         )
-        
-        if result.modified_count == 0:
-            return jsonify({"success": False, "message": "Eroare la actualizarea stocului!"})
-        
-        order = {
-            "order_code": f"ORD-{random.randint(10000, 99999)}",
-            "moto_id": moto_id,
-            "product_name": prod['name'],  # SNAPSHOT
-            "price_snapshot": prod['price'],  # SNAPSHOT - prețul nu se schimbă
-            "date": datetime.now(),
-            "status": "Confirmed"
-        }
-        db.orders.insert_one(order)
-        
-        return jsonify({
-            "success": True, 
-            "message": f"✅ Ai cumpărat {prod['name']} cu {prod['price']} €!"
-        })
-    except Exception as e:
-        return jsonify({"success": False, "message": f"Eroare: {str(e)}"})
+        report[name] = result
+    return report
 
-@app.route('/api/vector-search')
-def search_route():
+
+# INDEX REGISTRY - toate indexurile aplicatiei, declarate intr-un singur loc
+INDEX_REGISTRY = {
+    "products": [
+        pymongo.IndexModel([("moto_id", 1)], unique=True),
+        pymongo.IndexModel([("price", 1)]),
+        pymongo.IndexModel([("brand", 1)]),
+        pymongo.IndexModel([("price", 1), ("moto_id", 1)]),  # Keyset pe pret
+        pymongo.IndexModel([("brand", 1), ("price", 1), ("moto_id", 1)]),
+    ],
+    "orders": [
+        pymongo.IndexModel([("order_code", 1)], unique=True),
+        pymongo.IndexModel([("date", 1), ("moto_id", 1)]),  # get_orders (sort), top_sales (interval)
+        pymongo.IndexModel([("moto_id", 1)]),  # top_sales
+    ],
+    "users": [
+        pymongo.IndexModel([("user_id", 1)], unique=True),
+        pymongo.IndexModel([("email", 1)], unique=True),
+    ],
+    "sales_daily": [
+        pymongo.IndexModel([("day", 1), ("moto_id", 1)], unique=True),  # Cheia rollup-ului
+    ],
+}
+
+
+def index_definition(key, unique):
     """
-    Simulare Vector Database Search
-    În producție, s-ar folosi MongoDB Atlas Vector Search sau Pinecone
-    Calculăm Cosine Similarity între vectori
+    Definitia comparabila a unui index: lista (camp, directie) + unique
     """
-    try:
-        query = np.random.rand(5)
-        
-        products = list(db.products.find({}, {'_id': 0}))
-        results = []
-        
-        for p in products:
-            if 'vector_embedding' in p:
-                v = np.array(p['vector_embedding'])
-                score = np.dot(query, v) / (np.linalg.norm(query) * np.linalg.norm(v))
-                results.append({
-                    "name": p['name'], 
-                    "price": p['price'], 
-                    "score": round(score * 100, 1)
-                })
-        
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return jsonify(results[:5])  # Top 5 rezultate
-    except Exception as e:
+    return [(field, int(direction) if isinstance(direction, float) else direction) for field, direction in key], bool(unique)
+
+
+def declared_definition(model):
+    return index_definition(model.document["key"].items(), model.document.get("unique", False))
+
+
+def existing_definition(info):
+    return index_definition(info["key"], info.get("unique", False))
+
+
+def index_conflict(model, existing):
+    """
+    Indexul existent care ocupa numele sau cheia indexului declarat, dar are
+    alta definitie (ex: moto_id_1 creat fara unique). None daca nu exista.
+    """
+    key, unique = declared_definition(model)
+    for name, info in existing.items():
+        if name == "_id_":
+            continue
+        actual = existing_definition(info)
+        if (name == model.document["name"] or actual[0] == key) and actual != (key, unique):
+            return name
+    return None
+
+
+def ensure_indexes(rebuild=False):
+    """
+    Creeaza indexurile din INDEX_REGISTRY (idempotent - un index existent
+    cu aceeasi definitie nu mai este recreat). Un index existent cu acelasi
+    nume sau aceeasi cheie dar alte optiuni (ex: fara unique) apare in raport
+    ca "mismatched"; doar cu rebuild=True (CLI migrate, ?apply=1) este sters
+    si recreat - la startup toti workerii ruleaza in paralel si unul ar putea
+    sterge indexul tocmai construit de altul. Daca noul index nu se poate
+    construi (ex: duplicate), indexul vechi este refacut si eroarea apare in raport.
+    """
+    report = []
+    for coll_name, models in INDEX_REGISTRY.items():
+        coll = db[coll_name]
+        existing = coll.index_information()
+        for model in models:
+            name = model.document["name"]
+            if declared_definition(model) in (existing_definition(info) for info in existing.values()):
+                report.append({"collection": coll_name, "name": name, "status": "ok"})
+                continue
+            conflict = index_conflict(model, existing)
+            try:
+                if conflict is None:
+                    coll.create_indexes([model])
+                    report.append({"collection": coll_name, "name": name, "status": "ok"})
+                    continue
+                if not rebuild:
+                    report.append({"collection": coll_name, "name": name, "status": "mismatched", "existing": conflict})
+                    continue
+                old = existing[conflict]
+                coll.drop_index(conflict)
+                try:
+                    coll.create_indexes([model])
+                except pymongo.errors.OperationFailure:
+                    coll.create_index(old["key"], name=conflict, unique=old.get("unique", False))
+                    raise
+                report.append({"collection": coll_name, "name": name, "status": "rebuilt", "replaced": conflict})
+            except pymongo.errors.OperationFailure as e:
+                report.append({"collection": coll_name, "name": name, "status": "error", "error": str(e)})
+    return report
+
+
+# RESPONSE CACHE - LRU cu TTL pentru endpoint-urile de agregare
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL_SECONDS = 30
+# Rutele de analiza citesc de pe secundare, dar invalidarea vine din scrierile pe
+# primar: prima citire dupa o scriere poate vedea inca datele vechi (replication
+# lag) si le-ar tine in cache tot TTL-ul. Un TTL scurt margineste intarzierea la
+# lag + cateva secunde; pe primar folosim TTL-ul normal.
+ANALYTICS_CACHE_TTL_SECONDS = float(os.environ.get(
+    "MOTO_ANALYTICS_CACHE_TTL_SECONDS", CACHE_TTL_SECONDS if ANALYTICS_READ_PREFERENCE == "primary" else 5
+))
+
+
+class ResponseCache:
+    """
+    Cache LRU marginit, cu TTL. Fiecare intrare are tag-uri (colectiile de care
+    depinde), iar o scriere invalideaza doar intrarile cu tag-urile atinse.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Creste la fiecare invalidare; un rezultat calculat inainte de o
+        # scriere concurenta nu mai este salvat in cache
+        self.generation = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires"] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, tags, body, mimetype, generation, ttl=None):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = {
+                "expires": time.monotonic() + (self.ttl if ttl is None else ttl),
+                "tags": frozenset(tags),
+                "body": body,
+                "mimetype": mimetype,
+                "etag": hashlib.sha1(body).hexdigest()
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, *tags):
+        with self.lock:
+            self.generation += 1
+            stale = [key for key, entry in self.entries.items() if entry["tags"] & set(tags)]
+            for key in stale:
+                del self.entries[key]
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_cache(*tags):
+    """
+    Apelata de rutele care scriu: tag-urile sunt numele colectiilor modificate
+    """
+    response_cache.invalidate(*tags)
+
+
+def cached_response(*tags, ttl=None):
+    """
+    Decorator pentru rute GET: cheia este ruta + parametrii din query string.
+    Raspunsurile au ETag si Cache-Control: no-cache, deci polling-ul
+    dashboard-ului primeste 304 Not Modified cat timp datele nu s-au schimbat.
+    ttl: suprascrie CACHE_TTL_SECONDS (ex: rutele care citesc de pe secundare)
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            entry = response_cache.get(key)
+            if entry is None:
+                generation = response_cache.generation
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response_cache.put(key, tags, response.get_data(), response.mimetype, generation, ttl)
+                etag = hashlib.sha1(response.get_data()).hexdigest()
+            else:
+                response = Response(entry["body"], mimetype=entry["mimetype"])
+                etag = entry["etag"]
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+# MATERIALIZED STATS - un singur document cu totalurile pentru dashboard
+STATS_DOC_ID = "totals"
+
+
+def bump_stats(orders=0, revenue=0, products=0, price_sum=0):
+    """
+    Actualizeaza atomic documentul de statistici cu $inc
+    Fara upsert: daca documentul lipseste, un $inc ar crea totaluri partiale
+    (ex: doar comanda curenta); get_stats il reconstruieste complet la citire.
+    """
+    db.shop_stats.update_one(
+        {"_id": STATS_DOC_ID},
+        {"$inc": {
+            "total_orders": orders,
+            "total_revenue": revenue,
+            "total_products": products,
+            "price_sum": price_sum
+        }}
+    )
+
+
+def rebuild_stats():
+    """
+    Recalculeaza totalurile de la zero din colectiile orders si products
+    Folosit la prima cerere sau cand suspectam ca documentul s-a desincronizat
+    """
+    revenue_result = list(db.orders.aggregate([
+        {"$group": {"_id": None, "count": {"$sum": 1}, "total": {"$sum": "$price_snapshot"}}}
+    ]))
+    price_result = list(db.products.aggregate([
+        {"$group": {"_id": None, "count": {"$sum": 1}, "total": {"$sum": "$price"}}}
+    ]))
+
+    totals = {
+        "total_orders": revenue_result[0]["count"] if revenue_result else 0,
+        "total_revenue": revenue_result[0]["total"] if revenue_result else 0,
+        "total_products": price_result[0]["count"] if price_result else 0,
+        "price_sum": price_result[0]["total"] if price_result else 0,
+        "rebuilt_at": datetime.now()
+    }
+    db.shop_stats.replace_one({"_id": STATS_DOC_ID}, totals, upsert=True)
+    return totals
+
+
+# SALES ROLLUP - vanzari pre-agregate pe zi si produs (colectia sales_daily)
+def day_bucket(when):
+    return datetime(when.year, when.month, when.day)
+
+
+def record_sales(orders):
+    """
+    Adauga comenzile noi in sales_daily cu $inc + upsert
+    (un singur round-trip si pentru un cos cu mai multe linii)
+    """
+    buckets = {}
+    for order in orders:
+        key = (day_bucket(order["date"]), order["moto_id"])
+        count, revenue = buckets.get(key, (0, 0))
+        buckets[key] = (count + 1, revenue + order["price_snapshot"])
+    if not buckets:
+        return
+    db.sales_daily.bulk_write([
+        pymongo.UpdateOne(
+            {"day": day, "moto_id": moto_id},
+            {"$inc": {"orders_count": count, "revenue": revenue}},
+            upsert=True
+        )
+        for (day, moto_id), (count, revenue) in buckets.items()
+    ], ordered=False)
+
+
+SALES_DAILY_REBUILD = "sales_daily_rebuild"
+# Zilele recalculate dupa swap incep cu aceasta marja inainte de startul
+# reconstructiei (ceasurile workerilor pot fi usor decalate)
+SALES_RECONCILE_MARGIN = timedelta(minutes=10)
+
+
+def sales_daily_pipeline(match):
+    """
+    orders -> randuri sales_daily (zi, produs, numar comenzi, venit)
+    """
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "day": {"$dateTrunc": {"date": "$date", "unit": "day"}},
+                "moto_id": "$moto_id"
+            },
+            "orders_count": {"$sum": 1},
+            "revenue": {"$sum": "$price_snapshot"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "day": "$_id.day",
+            "moto_id": "$_id.moto_id",
+            "orders_count": 1,
+            "revenue": 1
+        }}
+    ]
+
+
+def backfill_sales_daily():
+    """
+    Reconstruieste sales_daily din toata colectia orders, pe server.
+    Agregarea scrie ($out) intr-o colectie temporara care inlocuieste apoi
+    sales_daily printr-un rename: cititorii vad mereu un rollup complet.
+
+    Swap-ul nu este atomic fata de record_sales: o comanda noua poate fi
+    numarata de agregare si de propriul $inc, sau $inc-ul ei se poate duce in
+    colectia veche chiar inainte de rename (ObjectId-urile se genereaza pe
+    client, deci ordinea lor nu e ordinea inserarii intre workeri). De aceea,
+    dupa swap recalculam din orders zilele atinse de la startul reconstructiei
+    si le scriem peste rollup cu $merge. Ramane doar fereastra acestui $merge
+    (cateva milisecunde pe zilele recente).
+    """
+    reconcile_from = day_bucket(datetime.now() - SALES_RECONCILE_MARGIN)
+    db.orders.aggregate(sales_daily_pipeline({}) + [{"$out": SALES_DAILY_REBUILD}], allowDiskUse=True)
+    # Indexul unic trebuie sa existe inainte de swap (record_sales face upsert pe el)
+    db[SALES_DAILY_REBUILD].create_indexes(INDEX_REGISTRY["sales_daily"])
+    db[SALES_DAILY_REBUILD].rename("sales_daily", dropTarget=True)
+
+    db.orders.aggregate(sales_daily_pipeline({"date": {"$gte": reconcile_from}}) + [{"$merge": {
+        "into": "sales_daily",
+        "on": ["day", "moto_id"],
+        "whenMatched": "merge",
+        "whenNotMatched": "insert"
+    }}])
+    return db.sales_daily.estimated_document_count()
+
+
+def parse_day_range(args):
+    """
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD (ambele inclusive) -> filtru pe campul day
+    """
+    day_filter = {}
+    if args.get('from'):
+        day_filter["$gte"] = datetime.strptime(args['from'], "%Y-%m-%d")
+    if args.get('to'):
+        day_filter["$lt"] = datetime.strptime(args['to'], "%Y-%m-%d") + timedelta(days=1)
+    return {"day": day_filter} if day_filter else {}
+
+
+# COMPRESSION - raspunsurile dinamice se comprima dupa Accept-Encoding
+# (br > zstd > gzip); payload-urile mici raman necomprimate
+COMPRESS_MIN_BYTES = int(os.environ.get("MOTO_COMPRESS_MIN_BYTES", "1024"))
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/x-ndjson", "application/javascript", "text/html", "text/css", "text/plain"
+}
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 5  # 11 e prea lent pentru continut dinamic
+COMPRESS_ZSTD_LEVEL = 3
+STREAM_FLUSH_BYTES = 64 * 1024  # Flush la streaming dupa atatia bytes necomprimati
+
+
+def gzip_compressor():
+    c = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 = format gzip
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+def brotli_compressor():
+    c = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+    return c.process, c.flush, c.finish
+
+
+def zstd_compressor():
+    c = zstandard.ZstdCompressor(level=COMPRESS_ZSTD_LEVEL).compressobj()
+    return c.compress, lambda: c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), c.flush
+
+
+# Fiecare fabrica intoarce (compress(chunk), flush() pentru streaming, finish())
+COMPRESSORS = {"gzip": gzip_compressor}
+if zstandard is not None:
+    COMPRESSORS = {"zstd": zstd_compressor, **COMPRESSORS}
+if brotli is not None:
+    COMPRESSORS = {"br": brotli_compressor, **COMPRESSORS}
+
+
+def negotiate_encoding(available, accept_encodings=None):
+    """
+    Prima codare (in ordinea preferintei serverului) acceptata de client.
+    accept_encodings: antetul parsat, implicit cel al cererii Flask curente
+    """
+    if accept_encodings is None:
+        accept_encodings = request.accept_encodings
+    for encoding in available:
+        if encoding != "identity" and accept_encodings[encoding]:
+            return encoding
+    return "identity"
+
+
+def record_compression(encoding, bytes_in, bytes_out, cpu_seconds):
+    labels = (("encoding", encoding),)
+    metrics.inc("moto_http_compression_bytes_in_total", labels, bytes_in)
+    metrics.inc("moto_http_compression_bytes_out_total", labels, bytes_out)
+    metrics.inc("moto_http_compression_saved_bytes_total", labels, bytes_in - bytes_out)
+    metrics.inc("moto_http_compression_cpu_seconds_total", labels, cpu_seconds)
+
+
+def compress_body(body, encoding):
+    """
+    Comprima un corp complet; None sub COMPRESS_MIN_BYTES (ramane necomprimat)
+    """
+    if len(body) < COMPRESS_MIN_BYTES:
+        metrics.inc("moto_http_compression_skipped_total")
+        return None
+    start = time.thread_time()
+    compress, _, finish = COMPRESSORS[encoding]()
+    compressed = compress(body) + finish()
+    record_compression(encoding, len(body), len(compressed), time.thread_time() - start)
+    return compressed
+
+
+def compress_stream(chunks, encoding):
+    """
+    Comprima un raspuns streamed incremental. Flush-ul (sync flush gzip, flush
+    brotli, bloc zstd) costa CPU si raport de compresie, asa ca il facem o data
+    pe batch de cursor (STREAM_BATCH_SIZE bucati) sau la STREAM_FLUSH_BYTES,
+    nu dupa fiecare linie NDJSON.
+    """
+    compress, flush, finish = COMPRESSORS[encoding]()
+    bytes_in = bytes_out = 0
+    pending_chunks = pending_bytes = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            start = time.thread_time()
+            out = compress(chunk)
+            pending_chunks += 1
+            pending_bytes += len(chunk)
+            if pending_chunks >= STREAM_BATCH_SIZE or pending_bytes >= STREAM_FLUSH_BYTES:
+                out += flush()
+                pending_chunks = pending_bytes = 0
+            cpu_seconds += time.thread_time() - start
+            bytes_in += len(chunk)
+            bytes_out += len(out)
+            if out:
+                yield out
+        start = time.thread_time()
+        out = finish()
+        cpu_seconds += time.thread_time() - start
+        bytes_out += len(out)
+        yield out
+    finally:
+        record_compression(encoding, bytes_in, bytes_out, cpu_seconds)
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Comprima raspunsurile care nu sunt deja comprimate (shell-ul si asset-urile
+    au variante precalculate). Raspunsurile streamed se comprima incremental.
+    """
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(COMPRESSORS)
+    if encoding == "identity":
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        compressed = compress_body(response.get_data(), encoding)
+        if compressed is None:
+            return response
+        response.set_data(compressed)
+
+    response.headers["Content-Encoding"] = encoding
+    # ETag-ul tare descrie corpul necomprimat; comparatia If-None-Match este slaba
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# HTML SHELL - compilat o singura data la pornire: CSS/JS separate in asset-uri
+# cu amprenta (hash) in nume, variante gzip/brotli precalculate si ETag tare
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+
+class StaticAsset:
+    """
+    Continut static precompilat: corpul si variantele comprimate, calculate o data
+    """
+
+    def __init__(self, body, mimetype):
+        self.mimetype = mimetype
+        self.fingerprint = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+
+    def response(self, cache_control):
+        """
+        Varianta potrivita pentru Accept-Encoding; 304 daca If-None-Match se potriveste.
+        ETag-ul difera per varianta (corpul trimis difera).
+        """
+        encoding = negotiate_encoding(("br", "gzip") if "br" in self.variants else ("gzip",))
+        etag = self.fingerprint if encoding == "identity" else f"{self.fingerprint}-{encoding}"
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[encoding], mimetype=self.mimetype)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = cache_control
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def build_shell(template):
+    """
+    Randeaza template-ul o singura data si muta <style>/<script> in asset-uri
+    externe cu amprenta: /assets/app.<hash>.css si /assets/app.<hash>.js
+    """
+    html = app.jinja_env.from_string(template).render()
+    assets = {}
+
+    def extract(tag, mimetype, extension, reference):
+        nonlocal html
+        match = re.search(rf"<{tag}>(.*?)</{tag}>", html, re.S)
+        asset = StaticAsset(match.group(1).strip().encode(), mimetype)
+        name = f"app.{asset.fingerprint}.{extension}"
+        assets[name] = asset
+        html = html[:match.start()] + reference.format(f"/assets/{name}") + html[match.end():]
+
+    extract("style", "text/css", "css", '<link rel="stylesheet" href="{}">')
+    extract("script", "application/javascript", "js", '<script src="{}"></script>')
+    return StaticAsset(html.encode(), "text/html"), assets
+
+
+SHELL, ASSETS = build_shell(HTML_INTERFACE)
+
+
+@app.route('/')
+def index():
+    """
+    Shell-ul se revalideaza la fiecare vizita (no-cache): vizitele repetate primesc
+    304. Asset-urile au hash-ul in nume, deci pot fi tinute in cache un an.
+    """
+    return SHELL.response("no-cache")
+
+
+@app.route('/assets/<name>')
+def static_asset(name):
+    asset = ASSETS.get(name)
+    if asset is None:
+        return jsonify({"error": "Asset inexistent"}), 404
+    return asset.response(f"public, max-age={ASSET_MAX_AGE}, immutable")
+
+@app.route('/api/stats')
+@cached_response("orders", "products")
+def get_stats():
+    """
+    Citim un singur document materializat (shop_stats) in loc sa scanam
+    colectiile orders si products la fiecare refresh al dashboard-ului.
+    Totalurile sunt mentinute cu $inc la fiecare scriere.
+
+    ?rebuild=1 - recalculeaza totalurile cu Aggregation Pipeline (drift)
+    """
+    try:
+        if request.args.get('rebuild') == '1':
+            totals = rebuild_stats()
+            invalidate_cache("orders", "products")
+        else:
+            totals = db.shop_stats.find_one({"_id": STATS_DOC_ID})
+            if totals is None:
+                totals = rebuild_stats()
+
+        total_products = totals.get("total_products", 0)
+        price_sum = totals.get("price_sum", 0)
+        avg_price = round(price_sum / total_products, 0) if total_products else 0
+
+        return jsonify({
+            "total_products": total_products,
+            "total_orders": totals.get("total_orders", 0),
+            "total_revenue": totals.get("total_revenue", 0),
+            "avg_price": avg_price
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# STREAMING - raspunsuri NDJSON pentru listele mari
+STREAM_BATCH_SIZE = 500  # Documente per round-trip (getMore) catre MongoDB
+
+
+def wants_stream():
+    """
+    Clientul cere streaming cu Accept: application/x-ndjson sau ?stream=1
+    """
+    if request.args.get('stream') == '1':
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def stream_ndjson(cursor):
+    """
+    Parcurge cursorul PyMongo in batch-uri si trimite cate un document pe linie.
+    Nu tinem niciodata toata colectia (sau tot payload-ul JSON) in memorie.
+    """
+    def generate():
+        for doc in cursor.batch_size(STREAM_BATCH_SIZE):
+            yield app.json.encode(doc) + b"\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+# PROJECTIONS - fiecare endpoint de lista citeste doar campurile de care are nevoie
+# default: ce foloseste interfata web; allowed: ce se poate cere cu ?fields=a,b,c
+LIST_FIELDS = {
+    "products": {
+        # vector_embedding si specs nu sunt folosite de grila de produse
+        "default": ("moto_id", "name", "brand", "type", "cc", "price", "stock", "color"),
+        "allowed": ("moto_id", "name", "brand", "type", "cc", "price", "stock", "color",
+                    "specs", "vector_embedding", "created_at"),
+    },
+    "users": {
+        "default": ("user_id", "name", "email", "addresses"),
+        "allowed": ("user_id", "name", "email", "addresses", "created_at", "updated_at"),
+    },
+    "orders": {
+        "default": ("order_code", "moto_id", "product_name", "price_snapshot", "date", "status"),
+        "allowed": ("order_code", "checkout_code", "customer_ref", "moto_id", "product_name",
+                    "price_snapshot", "date", "status"),
+    },
+}
+
+# Indexul vectorial (incarcare si change streams) are nevoie doar de acestea
+VECTOR_PROJECTION = {'_id': 0, 'moto_id': 1, 'name': 1, 'price': 1, 'vector_embedding': 1}
+
+
+def list_projection(resource, args, required=()):
+    """
+    Projection pentru un endpoint de lista: setul implicit sau ?fields=a,b,c.
+    Campurile din required (ex: cheile de sortare ale cursorului) sunt incluse mereu.
+    """
+    fields = LIST_FIELDS[resource]["default"]
+    if args.get('fields'):
+        fields = [name.strip() for name in args['fields'].split(',') if name.strip()]
+        unknown = [name for name in fields if name not in LIST_FIELDS[resource]["allowed"]]
+        if unknown:
+            raise ValueError(
+                f"Campuri necunoscute: {', '.join(unknown)} "
+                f"(permise: {', '.join(LIST_FIELDS[resource]['allowed'])})"
+            )
+
+    projection = {'_id': 0}
+    for name in (*required, *fields):
+        projection[name] = 1
+    return projection
+
+
+# KEYSET PAGINATION - ordinea de sortare se termina mereu in moto_id (unic),
+# astfel incat cursorul identifica exact pozitia in index
+PRODUCT_SORTS = {
+    "moto_id": [("moto_id", 1)],
+    "price": [("price", 1), ("moto_id", 1)],
+    "-price": [("price", -1), ("moto_id", -1)],
+}
+PRODUCTS_PAGE_DEFAULT = 50
+PRODUCTS_PAGE_MAX = 200
+
+
+def parse_number(value):
+    """
+    Converteste un parametru din query string in int sau float
+    """
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def encode_product_cursor(product, sort):
+    """
+    Cursorul este moto_id pentru sort=moto_id si "price|moto_id" pentru sortarile dupa pret
+    """
+    if sort == "moto_id":
+        return product["moto_id"]
+    return f"{product['price']}|{product['moto_id']}"
+
+
+def keyset_condition(after, sort):
+    """
+    Construieste conditia "dupa cursor" - folosim indexul, nu skip/offset,
+    deci o pagina adanca costa la fel ca prima pagina
+    """
+    if sort == "moto_id":
+        return {"moto_id": {"$gt": after}}
+
+    price_str, _, moto_id = after.partition("|")
+    if not moto_id:
+        raise ValueError("cursor invalid")
+    price = parse_number(price_str)
+    op = "$gt" if sort == "price" else "$lt"
+    return {"$or": [
+        {"price": {op: price}},
+        {"price": price, "moto_id": {op: moto_id}}
+    ]}
+
+
+def parse_products_query(args):
+    """
+    Transforma parametrii din query string in (filtru MongoDB, sortare, limit)
+    Arunca ValueError cu mesajul pentru client daca parametrii sunt invalizi
+    """
+    sort = args.get('sort', 'moto_id')
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"Sortare invalida: {sort}")
+
+    try:
+        limit = int(args.get('limit', PRODUCTS_PAGE_DEFAULT))
+    except ValueError:
+        raise ValueError("Parametrul limit trebuie sa fie numar")
+    limit = max(1, min(limit, PRODUCTS_PAGE_MAX))
+
+    query = {}
+    if args.get('brand'):
+        query["brand"] = args['brand']
+    if args.get('type'):
+        query["type"] = args['type']
+
+    try:
+        price_range = {}
+        if args.get('min_price'):
+            price_range["$gte"] = parse_number(args['min_price'])
+        if args.get('max_price'):
+            price_range["$lte"] = parse_number(args['max_price'])
+        if price_range:
+            query["price"] = price_range
+
+        if args.get('after'):
+            query.update(keyset_condition(args['after'], sort))
+    except ValueError:
+        raise ValueError("Parametri de pret sau cursor invalizi")
+
+    return query, sort, limit
+
+
+def products_page(prods, sort, limit):
+    """
+    Primeste limit + 1 documente; daca exista al limit+1-lea, avem pagina urmatoare
+    """
+    next_cursor = None
+    if len(prods) > limit:
+        prods = prods[:limit]
+        next_cursor = encode_product_cursor(prods[-1], sort)
+    return {"items": prods, "next_cursor": next_cursor}
+
+
+@app.route('/api/products')
+def get_products():
+    """
+    CRUD: READ - Citim produsele din MongoDB cu paginare pe cursor (keyset)
+    Folosim projection pentru a exclude _id (nu e serializabil în JSON direct)
+
+    Parametri: ?after=<moto_id|price|moto_id>&limit=&brand=&type=&min_price=&max_price=&sort=&fields=
+    sort: moto_id (implicit), price, -price
+    fields: campurile intoarse (implicit fara vector_embedding si specs)
+    Cu ?stream=1 (sau Accept: application/x-ndjson) trimitem toate produsele
+    de dupa cursor ca NDJSON; limit se aplica doar daca este dat explicit.
+    """
+    try:
+        args = request.args
+        try:
+            query, sort, limit = parse_products_query(args)
+            projection = list_projection("products", args, [field for field, _ in PRODUCT_SORTS[sort]])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if wants_stream():
+            cursor = db.products.find(query, projection).sort(PRODUCT_SORTS[sort])
+            if args.get('limit'):
+                cursor = cursor.limit(limit)
+            return stream_ndjson(cursor)
+
+        # Cerem limit + 1 documente ca sa stim daca exista o pagina urmatoare
+        prods = list(
+            db.products.find(query, projection)
+            .sort(PRODUCT_SORTS[sort])
+            .limit(limit + 1)
+        )
+
+        return jsonify(products_page(prods, sort, limit))
+    except Exception as e:
+        return jsonify({"error": "Eroare la citirea produselor", "details": str(e)}), 500
+
+def new_order_code(prefix="ORD", when=None):
+    """
+    Cod de comanda unic si sortabil in timp, generat local (fara round-trip la DB):
+    ORD-20260122-<ObjectId>. ObjectId contine timestamp + valoare aleatoare per
+    proces + contor, deci nu exista coliziuni intre workeri sau hosturi.
+    Unicitatea este garantata suplimentar de indexul unic pe orders.order_code.
+    """
+    return f"{prefix}-{(when or datetime.now()):%Y%m%d}-{str(ObjectId()).upper()}"
+
+
+# GENERATOR DATE SINTETICE - batch-uri vectorizate NumPy + insert_many paralel
+INIT_DEFAULTS = {"products": 30, "users": 5, "orders": 0}
+INIT_LIMITS = {"products": 2_000_000, "users": 1_000_000, "orders": 20_000_000}
+INIT_CHUNK = 10_000
+INIT_WORKERS = 4
+INIT_HISTORY_DAYS = 730
+
+BRANDS = ["Yamaha", "Honda", "Ducati", "BMW", "KTM", "Kawasaki", "Harley-Davidson"]
+TYPES = ["Sport", "Naked", "Adventure", "Cruiser", "Enduro"]
+COLORS = ["Red", "Black", "Blue", "White", "Matte Black", "Orange"]
+ENGINE_CC = np.array([300, 600, 750, 1000, 1200])
+CITIES = ["Bucuresti", "Cluj-Napoca", "Timisoara", "Iasi", "Constanta"]
+STREETS = ["Str. Libertatii", "Bd. Unirii", "Calea Victoriei", "Str. Mihai Eminescu", "Aleea Rozelor"]
+ADDRESS_LABELS = ["Acasa", "Birou", "Parinti"]
+
+
+def chunk_rng(seed, kind, chunk_index):
+    """
+    Generator determinist per chunk - acelasi seed produce aceleasi date
+    indiferent de ordinea in care workerii proceseaza chunk-urile
+    """
+    return np.random.default_rng([seed, kind, chunk_index])
+
+
+def product_catalog(n, seed):
+    """
+    Atributele de baza ale tuturor produselor, generate vectorizat o singura data
+    (comenzile au nevoie de nume si pret pentru SNAPSHOT PATTERN)
+    """
+    rng = np.random.default_rng([seed, 0])
+    brand = rng.integers(0, len(BRANDS), n)
+    moto_type = rng.integers(0, len(TYPES), n)
+    cc = ENGINE_CC[rng.integers(0, len(ENGINE_CC), n)]
+    price = 5000 + cc * 8 + rng.integers(-500, 2001, n)
+    names = [f"{BRANDS[b]} {TYPES[t]} {c}" for b, t, c in zip(brand.tolist(), moto_type.tolist(), cc.tolist())]
+    return {"brand": brand, "type": moto_type, "cc": cc, "price": price, "name": names}
+
+
+def build_products(catalog, start, size, seed, chunk_index):
+    rng = chunk_rng(seed, 1, chunk_index)
+    stock = rng.integers(0, 9, size).tolist()
+    color = rng.integers(0, len(COLORS), size).tolist()
+    weight = rng.integers(150, 281, size).tolist()
+    tank = rng.integers(12, 26, size).tolist()
+    warranty = rng.integers(1, 4, size).tolist()
+    vectors = rng.random((size, VECTOR_DIM)).tolist()
+    brand = catalog["brand"][start:start + size].tolist()
+    moto_type = catalog["type"][start:start + size].tolist()
+    cc = catalog["cc"][start:start + size].tolist()
+    price = catalog["price"][start:start + size].tolist()
+    now = datetime.now()
+    return [
+        {
+            "moto_id": f"M{start + i + 100}",
+            "name": catalog["name"][start + i],
+            "brand": BRANDS[brand[i]],  # Adăugăm brand separat pentru aggregation
+            "type": TYPES[moto_type[i]],
+            "cc": cc[i],
+            "price": price[i],
+            "stock": stock[i],
+            "color": COLORS[color[i]],
+            "specs": {
+                "weight_kg": weight[i],
+                "fuel_tank_l": tank[i],
+                "warranty_years": warranty[i]
+            },
+            "vector_embedding": vectors[i],
+            "created_at": now
+        }
+        for i in range(size)
+    ]
+
+
+def build_users(start, size, seed, chunk_index):
+    rng = chunk_rng(seed, 2, chunk_index)
+    num_addresses = rng.integers(1, 4, size).tolist()
+    cities = rng.integers(0, len(CITIES), (size, 3)).tolist()
+    streets = rng.integers(0, len(STREETS), (size, 3)).tolist()
+    numbers = rng.integers(1, 101, (size, 3)).tolist()
+    zips = rng.integers(100000, 1000000, (size, 3)).tolist()
+    now = datetime.now()
+    users = []
+    for i in range(size):
+        n = start + i + 1
+        users.append({
+            "user_id": f"U{n}",
+            "name": f"Client {n}",
+            "email": f"client{n}@motoshop.ro",
+            "addresses": [
+                {
+                    "label": ADDRESS_LABELS[j],
+                    "city": CITIES[cities[i][j]],
+                    "street": f"{STREETS[streets[i][j]]} {numbers[i][j]}",
+                    "zip": str(zips[i][j])
+                }
+                for j in range(num_addresses[i])
+            ],
+            "created_at": now
+        })
+    return users
+
+
+def popularity_cdf(n_products, seed):
+    """
+    Distributie realista a vanzarilor: putine produse vand mult (lege de putere)
+    """
+    rng = np.random.default_rng([seed, 3])
+    weights = 1.0 / np.arange(1, n_products + 1) ** 0.8
+    weights = weights[rng.permutation(n_products)]
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def build_orders(catalog, cdf, n_users, start, size, seed, chunk_index):
+    rng = chunk_rng(seed, 4, chunk_index)
+    product_idx = np.minimum(np.searchsorted(cdf, rng.random(size)), len(cdf) - 1)
+    # Istoric pe ultimii INIT_HISTORY_DAYS zile; datele sunt aleatoare, nesortate
+    # (chunk-urile se genereaza in paralel) - /api/orders sorteaza dupa date
+    now_ts = datetime.now().timestamp()
+    offsets = rng.random(size) * INIT_HISTORY_DAYS * 86400
+    dates = [datetime.fromtimestamp(ts) for ts in (now_ts - offsets).tolist()]
+    customers = rng.integers(1, n_users + 1, size).tolist() if n_users else [None] * size
+    product_idx = product_idx.tolist()
+    prices = catalog["price"]
+    orders = []
+    for i in range(size):
+        p = product_idx[i]
+        orders.append({
+            "order_code": new_order_code(when=dates[i]),
+            "customer_ref": f"U{customers[i]}" if customers[i] else None,
+            "moto_id": f"M{p + 100}",
+            "product_name": catalog["name"][p],  # SNAPSHOT
+            "price_snapshot": int(prices[p]),  # SNAPSHOT
+            "date": dates[i],
+            "status": "Confirmed"
+        })
+    return orders
+
+
+def parallel_load(coll, total, build_chunk, sum_field=None):
+    """
+    Genereaza si insereaza chunk-uri de INIT_CHUNK documente pe un pool de
+    thread-uri. PyMongo este thread-safe si elibereaza GIL-ul pe I/O, asa ca
+    generarea unui chunk se suprapune cu insert-ul altuia.
+    Returneaza suma campului sum_field peste documentele inserate (pentru shop_stats).
+    """
+    def load_chunk(chunk_index):
+        start = chunk_index * INIT_CHUNK
+        docs = build_chunk(start, min(INIT_CHUNK, total - start), chunk_index)
+        coll.insert_many(docs, ordered=False)
+        return sum(doc[sum_field] for doc in docs) if sum_field else 0
+
+    chunks = range((total + INIT_CHUNK - 1) // INIT_CHUNK)
+    with ThreadPoolExecutor(max_workers=INIT_WORKERS) as pool:
+        return sum(pool.map(load_chunk, chunks))
+
+
+@app.route('/api/init', methods=['POST'])
+def init_db_route():
+    """
+    CRUD: DELETE + CREATE
+    Ștergem colecțiile existente și generăm date noi
+    Demonstrează Flexible Schema - specs diferite per produs
+
+    Parametri: ?products=30&users=5&orders=0&seed=
+    Datele se genereaza vectorizat (NumPy) si se insereaza paralel in chunk-uri;
+    comenzile formeaza un istoric realist pentru endpoint-urile de agregare.
+    Indexurile se creeaza dupa incarcare (mai rapid decat la fiecare insert).
+    """
+    try:
+        counts = {}
+        for kind, default in INIT_DEFAULTS.items():
+            try:
+                counts[kind] = min(max(int(request.args.get(kind, default)), 0), INIT_LIMITS[kind])
+            except ValueError:
+                return jsonify({"error": f"Parametrul {kind} trebuie sa fie numar"}), 400
+        if counts["orders"] and not counts["products"]:
+            return jsonify({"error": "Comenzile au nevoie de cel putin un produs"}), 400
+        try:
+            seed = int(request.args['seed']) if 'seed' in request.args else int(np.random.SeedSequence().entropy % 2**32)
+        except ValueError:
+            return jsonify({"error": "Parametrul seed trebuie sa fie numar"}), 400
+        if seed < 0:
+            return jsonify({"error": "Parametrul seed trebuie sa fie >= 0"}), 400
+
+        # Catalogul se genereaza inainte de drop: o eroare aici nu lasa baza goala
+        start_time = time.perf_counter()
+        catalog = product_catalog(counts["products"], seed)
+
+        db.products.drop()
+        db.orders.drop()
+        db.users.drop()
+        db.shop_stats.drop()
+        db.sales_daily.drop()
+
+        parallel_load(db.products, counts["products"],
+                      lambda start, size, i: build_products(catalog, start, size, seed, i))
+        parallel_load(db.users, counts["users"],
+                      lambda start, size, i: build_users(start, size, seed, i))
+
+        revenue = 0
+        if counts["orders"]:
+            cdf = popularity_cdf(counts["products"], seed)
+            revenue = parallel_load(db.orders, counts["orders"],
+                                    lambda start, size, i: build_orders(catalog, cdf, counts["users"], start, size, seed, i),
+                                    sum_field="price_snapshot")
+        load_seconds = time.perf_counter() - start_time
+
+        # Totalurile sunt cunoscute din generator - scriem documentul direct
+        db.shop_stats.replace_one({"_id": STATS_DOC_ID}, {
+            "total_orders": counts["orders"],
+            "total_revenue": revenue,
+            "total_products": counts["products"],
+            "price_sum": int(catalog["price"].sum()),
+            "rebuilt_at": datetime.now()
+        }, upsert=True)
+        db.counters.update_one({"_id": "user_id"}, {"$set": {"seq": counts["users"]}}, upsert=True)
+        
+        ensure_indexes()
+        if counts["orders"]:
+            backfill_sales_daily()
+        vector_index.load()
+        invalidate_cache("products", "orders", "users")
+        total_seconds = time.perf_counter() - start_time
+        total_docs = sum(counts.values())
+        
+        return jsonify({
+            "status": "ok", 
+            "products_count": counts["products"],
+            "users_count": counts["users"],
+            "orders_count": counts["orders"],
+            "seed": seed,
+            "load_seconds": round(load_seconds, 2),
+            "total_seconds": round(total_seconds, 2),
+            "docs_per_sec": round(total_docs / load_seconds) if load_seconds > 0 else None
+        })
+    except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/test-performance')
-def test_performance():
+@app.route('/api/buy', methods=['POST'])
+def buy_route():
     """
-    SCALING STRATEGY: Indexare
-    Comparăm query cu și fără index pentru a demonstra impactul
+    CRUD: UPDATE (stoc) + CREATE (comandă)
+    Folosim find_one_and_update - fara citire separata inainte de update
+    Folosim SNAPSHOT PATTERN - copiem prețul la momentul comenzii
+    Folosim REFERENCING - customer_ref către user
     """
     try:
-        query = {"price": {"$gt": 8000}}
+        data = request.json
+        moto_id = data.get('id')
+        
+        if not moto_id:
+            return jsonify({"success": False, "message": "ID produs lipsă!"})
         
-        db.products.drop_indexes()
-        start = time.time()
-        count1 = db.products.count_documents(query)
-        list(db.products.find(query))
-        time1 = round((time.time() - start) * 1000, 2)  # ms
+        # Un singur round-trip atomic: verificare stoc + decrementare + snapshot
+        prod = db.products.find_one_and_update(
+            {"moto_id": moto_id, "stock": {"$gt": 0}},
+            {"$inc": {"stock": -1}},
+            projection={'_id': 0, 'name': 1, 'price': 1},
+            return_document=pymongo.ReturnDocument.AFTER
+        )
         
-        db.products.create_index("price")
-        start = time.time()
-        count2 = db.products.count_documents(query)
-        list(db.products.find(query))
-        time2 = round((time.time() - start) * 1000, 2)  # ms
+        if prod is None:
+            # Doar pe calea de eroare aflam de ce nu s-a potrivit filtrul
+            if db.products.find_one({"moto_id": moto_id}, {'_id': 1}) is None:
+                return jsonify({"success": False, "message": "Produs inexistent!"})
+            return jsonify({"success": False, "message": "Stoc epuizat!"})
         
-        improvement = round(time1 / time2, 1) if time2 > 0 else 1
+        order = {
+            "order_code": new_order_code(),
+            "moto_id": moto_id,
+            "product_name": prod['name'],  # SNAPSHOT
+            "price_snapshot": prod['price'],  # SNAPSHOT - prețul nu se schimbă
+            "date": datetime.now(),
+            "status": "Confirmed"
+        }
+        db.orders.insert_one(order)
+        bump_stats(orders=1, revenue=prod['price'])
+        record_sales([order])
+        invalidate_cache("orders", "products")
         
         return jsonify({
-            "without_index": {"time": time1, "count": count1},
-            "with_index": {"time": time2, "count": count2},
-            "improvement": improvement
+            "success": True, 
+            "message": f"✅ Ai cumpărat {prod['name']} cu {prod['price']} €!"
+        })
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Eroare: {str(e)}"})
+
+BATCH_MAX_LINES = 100
+
+
+@app.route('/api/buy/batch', methods=['POST'])
+def buy_batch_route():
+    """
+    Checkout cos: {"items": [{"moto_id": "M105", "qty": 2}, ...], "customer_ref": "U1"}
+
+    Round-trip-uri per cerere, indiferent de numarul de linii:
+    1. find cu $in - snapshot nume/pret (SNAPSHOT PATTERN) si verificare stoc
+    2. bulk_write neordonat cu $inc conditionat ({"stock": {"$gte": qty}})
+    3. insert_many pentru toate comenzile (cate un document per bucata,
+       ca in /api/buy, grupate prin checkout_code)
+
+    Fiecare update adauga codul checkout-ului in pending_checkouts ($addToSet,
+    deci un checkout concurent pe acelasi produs nu ne poate sterge marcajul).
+    Daca matched_count < numarul de update-uri (stocul nu a mai ajuns intre
+    citire si scriere), citim inapoi produsele marcate cu acest cod ca sa aflam
+    exact ce linii au decrementat stocul; la final scoatem marcajul cu $pull.
+    """
+    try:
+        data = request.json
+        if not data or not isinstance(data.get('items'), list) or not data['items']:
+            return jsonify({"success": False, "message": "Cosul este gol!"}), 400
+        if len(data['items']) > BATCH_MAX_LINES:
+            return jsonify({"success": False, "message": f"Maxim {BATCH_MAX_LINES} linii per comanda!"}), 400
+
+        # Liniile cu acelasi produs se aduna intr-o singura linie
+        quantities = {}
+        for item in data['items']:
+            moto_id = item.get('moto_id') if isinstance(item, dict) else None
+            qty = item.get('qty', 1) if isinstance(item, dict) else None
+            if not moto_id or not isinstance(qty, int) or isinstance(qty, bool) or qty <= 0:
+                return jsonify({"success": False, "message": f"Linie invalida: {item}"}), 400
+            quantities[moto_id] = quantities.get(moto_id, 0) + qty
+
+        products = {
+            p['moto_id']: p
+            for p in db.products.find(
+                {"moto_id": {"$in": list(quantities)}},
+                {'_id': 0, 'moto_id': 1, 'name': 1, 'price': 1, 'stock': 1}
+            )
+        }
+
+        checkout_code = new_order_code("CHK")
+        lines = []
+        ops = []
+        for moto_id, qty in quantities.items():
+            line = {"moto_id": moto_id, "qty": qty, "success": False}
+            prod = products.get(moto_id)
+            if not prod:
+                line["message"] = "Produs inexistent!"
+            elif prod['stock'] < qty:
+                line["message"] = "Stoc insuficient!"
+            else:
+                line["op_index"] = len(ops)
+                ops.append(pymongo.UpdateOne(
+                    {"moto_id": moto_id, "stock": {"$gte": qty}},  # Verificare atomică
+                    {"$inc": {"stock": -qty}, "$addToSet": {"pending_checkouts": checkout_code}}
+                ))
+            lines.append(line)
+
+        failed_ops = {}
+        decremented = set()
+        if ops:
+            op_ids = [line['moto_id'] for line in lines if "op_index" in line]
+            try:
+                matched = db.products.bulk_write(ops, ordered=False).matched_count
+            except pymongo.errors.BulkWriteError as bwe:
+                matched = bwe.details.get('nMatched', 0)
+                for err in bwe.details.get('writeErrors', []):
+                    failed_ops[err['index']] = err
+            if matched == len(ops):
+                decremented = set(op_ids)
+            else:
+                decremented = {
+                    p['moto_id']
+                    for p in db.products.find(
+                        {"moto_id": {"$in": op_ids}, "pending_checkouts": checkout_code},
+                        {'_id': 0, 'moto_id': 1}
+                    )
+                }
+            if matched:
+                db.products.update_many(
+                    {"moto_id": {"$in": op_ids}, "pending_checkouts": checkout_code},
+                    {"$pull": {"pending_checkouts": checkout_code}}
+                )
+
+        now = datetime.now()
+        orders = []
+        revenue = 0
+        for line in lines:
+            op_index = line.pop("op_index", None)
+            if op_index is None:
+                continue
+            if line['moto_id'] not in decremented:
+                err = failed_ops.get(op_index)
+                line["message"] = err.get('errmsg', 'Eroare') if err is not None else "Stoc insuficient!"
+                continue
+            prod = products[line['moto_id']]
+            line["success"] = True
+            line["message"] = f"{line['qty']} x {prod['name']}"
+            for _ in range(line['qty']):
+                orders.append({
+                    "order_code": new_order_code(),
+                    "checkout_code": checkout_code,
+                    "customer_ref": data.get('customer_ref'),
+                    "moto_id": line['moto_id'],
+                    "product_name": prod['name'],  # SNAPSHOT
+                    "price_snapshot": prod['price'],  # SNAPSHOT
+                    "date": now,
+                    "status": "Confirmed"
+                })
+            revenue += prod['price'] * line['qty']
+
+        if orders:
+            db.orders.insert_many(orders, ordered=False)
+            bump_stats(orders=len(orders), revenue=revenue)
+            record_sales(orders)
+        if ops:
+            invalidate_cache("orders", "products")
+
+        return jsonify({
+            "success": bool(orders),
+            "checkout_code": checkout_code if orders else None,
+            "orders_count": len(orders),
+            "total": revenue,
+            "lines": lines
+        })
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Eroare: {str(e)}"})
+
+# VECTOR INDEX - matrice float32 normalizata tinuta in memorie
+VECTOR_DIM = 5
+VECTOR_IVF_MIN_SIZE = 20000  # Sub acest numar de produse cautarea exacta e suficient de rapida
+VECTOR_IVF_NPROBE = 8        # Cate liste IVF scanam la o cautare aproximativa
+VECTOR_IVF_REBUILD_FRACTION = 0.2  # Re-clusterizare dupa ce ~20% din randuri s-au schimbat
+
+
+class VectorIndex:
+    """
+    Index vectorial in-process peste products.vector_embedding
+
+    - vectorii sunt normalizati o singura data, deci cosine similarity = produs scalar
+    - o cautare este un singur matmul + np.argpartition pentru top-k
+    - upsert actualizeaza matricea incremental (fara reincarcare din MongoDB);
+      stergerile (evenimentele delete au doar _id) reincarca indexul
+    - modul IVF (aproximativ) grupeaza vectorii in clustere cu k-means si
+      scaneaza doar clusterele cele mai apropiate de query
+    - k-means ruleaza pe un thread de fundal, fara lock; intre reconstruiri,
+      randurile noi/modificate se atribuie incremental celui mai apropiat centroid
+    """
+
+    def __init__(self, dim=VECTOR_DIM):
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.max_age = None
+        self.generation = 0
+        self.ivf_building = False
+        self._clear()
+
+    def _clear(self):
+        self.vectors = np.empty((1024, self.dim), dtype=np.float32)
+        self.size = 0
+        self.ids = []
+        self.meta = []
+        self.positions = {}
+        self.centroids = None
+        self.ivf_lists = None
+        self.assign = None          # lista IVF a fiecarui rand
+        self.dirty_lists = set()    # liste IVF de recalculat din assign
+        self.ivf_changes = 0        # randuri schimbate de la ultima clusterizare
+        self.ivf_touched = None     # randuri schimbate in timpul unei clusterizari
+        self.generation += 1
+
+    @staticmethod
+    def normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def load(self):
+        """
+        Reincarca tot indexul din MongoDB (la pornire sau dupa /api/init)
+        """
+        cursor = db.products.find(
+            {"vector_embedding": {"$exists": True}}, VECTOR_PROJECTION
+        ).batch_size(STREAM_BATCH_SIZE)
+        with self.lock:
+            self._clear()
+            self._upsert_many(cursor)
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        # max_age este setat doar cand nu avem change streams (fallback pe TTL)
+        stale = self.max_age is not None and time.monotonic() - self.loaded_at > self.max_age
+        if not self.loaded or stale:
+            self.load()
+
+    def invalidate(self):
+        """
+        Marcheaza indexul pentru reincarcare completa la urmatoarea cautare
+        """
+        self.loaded = False
+
+    def upsert(self, products):
+        """
+        Adauga sau actualizeaza produse (dict-uri cu moto_id, name, price, vector_embedding)
+        """
+        with self.lock:
+            self._upsert_many(products)
+
+    def _upsert_many(self, products):
+        changed = []
+        for p in products:
+            vector = p.get('vector_embedding')
+            if vector is None or len(vector) != self.dim:
+                continue
+            row = self.positions.get(p['moto_id'])
+            if row is None:
+                if self.size == len(self.vectors):
+                    grown = np.empty((len(self.vectors) * 2, self.dim), dtype=np.float32)
+                    grown[:self.size] = self.vectors[:self.size]
+                    self.vectors = grown
+                row = self.size
+                self.size += 1
+                self.ids.append(p['moto_id'])
+                self.meta.append(None)
+                self.positions[p['moto_id']] = row
+            self.vectors[row] = self.normalize(vector)
+            self.meta[row] = {"moto_id": p['moto_id'], "name": p.get('name'), "price": p.get('price')}
+            changed.append(row)
+        self._reassign(changed)
+
+    def _reassign(self, rows):
+        """
+        Atribuie randurile noi/modificate celui mai apropiat centroid existent
+        (un matmul mic) si marcheaza listele afectate pentru recalculare
+        """
+        if not rows:
+            return
+        if self.ivf_touched is not None:
+            self.ivf_touched.update(rows)
+        if self.centroids is None:
+            return
+        if len(self.assign) < len(self.vectors):
+            grown = np.zeros(len(self.vectors), dtype=np.int64)
+            grown[:len(self.assign)] = self.assign
+            self.assign = grown
+        rows = np.asarray(rows, dtype=np.int64)
+        self.dirty_lists.update(self.assign[rows].tolist())
+        self.assign[rows] = np.argmax(self.vectors[rows] @ self.centroids.T, axis=1)
+        self.dirty_lists.update(self.assign[rows].tolist())
+        self.ivf_changes += len(rows)
+        if self.ivf_changes > VECTOR_IVF_REBUILD_FRACTION * self.size:
+            self._start_ivf_build()
+
+    def vector_for(self, moto_id):
+        row = self.positions.get(moto_id)
+        return None if row is None else self.vectors[row].copy()
+
+    def _start_ivf_build(self):
+        """
+        Porneste k-means pe un thread de fundal, pe o copie a vectorilor
+        (apelat cu lock-ul luat; cautarile continua pe clusterele vechi)
+        """
+        if self.ivf_building or self.size == 0:
+            return
+        self.ivf_building = True
+        self.ivf_touched = set()
+        threading.Thread(
+            target=self._build_ivf, args=(self.vectors[:self.size].copy(), self.generation),
+            name="ivf-build", daemon=True
+        ).start()
+
+    def _build_ivf(self, data, generation, iterations=10, chunk=65536):
+        """
+        Spherical k-means pe vectorii normalizati; nlist ~ sqrt(N).
+        Ruleaza fara lock; la final randurile schimbate intre timp se reatribuie.
+        """
+        try:
+            size = len(data)
+            nlist = max(1, int(np.sqrt(size)))
+            rng = np.random.default_rng(0)
+            centroids = data[rng.choice(size, nlist, replace=False)].copy()
+            assign = np.empty(size, dtype=np.int64)
+            for _ in range(iterations):
+                for start in range(0, size, chunk):
+                    assign[start:start + chunk] = np.argmax(data[start:start + chunk] @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, data)
+                empty = ~sums.any(axis=1)
+                sums[empty] = centroids[empty]
+                centroids = self.normalize(sums)
+
+            with self.lock:
+                if generation != self.generation:
+                    return  # indexul a fost reincarcat intre timp
+                full = np.zeros(len(self.vectors), dtype=np.int64)
+                kept = min(size, self.size)
+                full[:kept] = assign[:kept]
+                stale = [row for row in self.ivf_touched if row < self.size] + list(range(size, self.size))
+                self.centroids = centroids
+                self.assign = full
+                self.ivf_touched = None
+                self.ivf_changes = 0
+                if stale:
+                    stale = np.asarray(stale, dtype=np.int64)
+                    self.assign[stale] = np.argmax(self.vectors[stale] @ centroids.T, axis=1)
+                current = self.assign[:self.size]
+                order = np.argsort(current, kind='stable')
+                bounds = np.searchsorted(current[order], np.arange(nlist + 1))
+                self.ivf_lists = [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+                self.dirty_lists = set()
+        finally:
+            with self.lock:
+                if generation == self.generation:
+                    self.ivf_touched = None
+                self.ivf_building = False
+
+    def search(self, query, k=5, exclude=None, approximate=False):
+        """
+        Returneaza top-k produse ca lista de (meta, score), score = cosine similarity
+        """
+        query = self.normalize(query)
+        with self.lock:
+            if self.size == 0:
+                return []
+            if approximate and self.centroids is None:
+                # Prima clusterizare ruleaza in fundal; pana atunci cautare exacta
+                self._start_ivf_build()
+                approximate = False
+            if approximate:
+                nprobe = min(VECTOR_IVF_NPROBE, len(self.centroids))
+                probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+                for i in probes:
+                    if i in self.dirty_lists:
+                        self.ivf_lists[i] = np.flatnonzero(self.assign[:self.size] == i)
+                        self.dirty_lists.discard(i)
+                rows = np.concatenate([self.ivf_lists[i] for i in probes])
+                scores = self.vectors[rows] @ query
+            else:
+                rows = np.arange(self.size)
+                scores = self.vectors[:self.size] @ query
+            if exclude is not None and exclude in self.positions:
+                scores[rows == self.positions[exclude]] = -np.inf
+            k = min(k, len(rows))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.meta[rows[i]], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+vector_index = VectorIndex()
+
+
+# CHANGE STREAMS - invalidare cache intre workeri / hosturi
+CHANGE_STREAMS_ENABLED = os.environ.get("MOTO_CHANGE_STREAMS", "1") != "0"
+CHANGE_STREAM_COLLECTIONS = ["products", "orders", "users"]
+CHANGE_STREAM_RETRY_SECONDS = 5
+# Invalidarile din change stream se comaseaza: cel mult una la atatea secunde
+# (un /api/init cu milioane de comenzi nu mai invalideaza cache-ul per document)
+CHANGE_STREAM_COALESCE_SECONDS = 0.05
+CHANGE_STREAM_AWAIT_MS = 100
+VECTOR_INDEX_TTL_SECONDS = 300  # Fallback fara change streams
+VECTOR_FIELDS = ("vector_embedding", "name", "price")
+
+change_stream_status = {"active": False, "fallback": None, "events": 0, "errors": 0}
+
+
+def apply_change(change, pending_tags):
+    """
+    Aplica un eveniment din change stream pe cache-urile acestui proces:
+    tag-ul colectiei intra in pending_tags (invalidat comasat de watch_changes)
+    + delta incrementala pe indexul vectorial
+    """
+    op = change["operationType"]
+    coll = change.get("ns", {}).get("coll")
+    if coll:
+        pending_tags.add(coll)
+    else:
+        pending_tags.update(CHANGE_STREAM_COLLECTIONS)
+
+    if coll not in ("products", None) or not vector_index.loaded:
+        return
+    if op in ("insert", "replace"):
+        vector_index.upsert([change["fullDocument"]])
+    elif op == "update":
+        updated = change.get("updateDescription", {}).get("updatedFields", {})
+        # Decrementarea stocului (cazul frecvent) nu afecteaza indexul vectorial
+        if any(field.split(".")[0] in VECTOR_FIELDS for field in updated):
+            doc = db.products.find_one(change["documentKey"], VECTOR_PROJECTION)
+            if doc:
+                vector_index.upsert([doc])
+    else:
+        # delete (avem doar _id), drop, rename, dropDatabase - reincarcare completa
+        vector_index.invalidate()
+
+
+def change_stream_unsupported(error):
+    """
+    Doar erorile de server care spun ca watch() nu e suportat: standalone fara
+    replica set (40573) sau $changeStream necunoscut (40324). Orice alta eroare
+    inseamna reconectare, nu renuntare la change streams.
+    """
+    return isinstance(error, pymongo.errors.OperationFailure) and (
+        error.code in (40573, 40324) or "replica set" in str(error)
+    )
+
+
+def watch_changes():
+    """
+    Thread de fundal: urmareste products/orders/users si reia de la ultimul
+    resume token dupa erori. Daca serverul nu suporta change streams, trecem
+    pe expirare TTL (cache-ul de raspunsuri are deja TTL; indexul vectorial
+    se reincarca periodic).
+    """
+    pipeline = [
+        {"$match": {"ns.coll": {"$in": CHANGE_STREAM_COLLECTIONS}}},
+        # Pentru orders/users ajung ns + operationType; documentul complet (si
+        # updateDescription) circula doar pentru products (indexul vectorial)
+        {"$set": {
+            "fullDocument": {"$cond": [{"$eq": ["$ns.coll", "products"]}, "$fullDocument", "$$REMOVE"]},
+            "updateDescription": {"$cond": [{"$eq": ["$ns.coll", "products"]}, "$updateDescription", "$$REMOVE"]}
+        }}
+    ]
+    resume_token = None
+    while True:
+        try:
+            with db.watch(pipeline, resume_after=resume_token, max_await_time_ms=CHANGE_STREAM_AWAIT_MS) as stream:
+                change_stream_status["active"] = True
+                pending_tags = set()
+                last_flush = 0.0
+                while stream.alive:
+                    change = stream.try_next()
+                    if change is not None:
+                        resume_token = stream.resume_token
+                        change_stream_status["events"] += 1
+                        try:
+                            apply_change(change, pending_tags)
+                        except Exception as e:
+                            # Un eveniment neasteptat (ex: produs fara moto_id) nu opreste
+                            # watcher-ul; indexul vectorial se reincarca la urmatoarea cautare
+                            change_stream_status["errors"] += 1
+                            print(f"Eroare la aplicarea evenimentului {change.get('operationType')}: {e}")
+                            vector_index.invalidate()
+                    # Prima schimbare dupa o pauza invalideaza imediat; in rafala,
+                    # cel mult o invalidare la CHANGE_STREAM_COALESCE_SECONDS
+                    now = time.monotonic()
+                    if pending_tags and (change is None or now - last_flush >= CHANGE_STREAM_COALESCE_SECONDS):
+                        invalidate_cache(*pending_tags)
+                        pending_tags.clear()
+                        last_flush = now
+                if pending_tags:
+                    invalidate_cache(*pending_tags)
+        except Exception as e:
+            change_stream_status["active"] = False
+            if change_stream_unsupported(e):
+                change_stream_status["fallback"] = "ttl"
+                vector_index.max_age = VECTOR_INDEX_TTL_SECONDS
+                print(f"Change streams indisponibile, folosim expirare TTL: {e}")
+                return
+            print(f"Change stream intrerupt, reincercam: {e}")
+            # Evenimentele pierdute pana la reconectare: invalidam tot
+            invalidate_cache(*CHANGE_STREAM_COLLECTIONS)
+            vector_index.invalidate()
+            time.sleep(CHANGE_STREAM_RETRY_SECONDS)
+
+
+def start_change_watcher():
+    if not CHANGE_STREAMS_ENABLED:
+        vector_index.max_age = VECTOR_INDEX_TTL_SECONDS
+        change_stream_status["fallback"] = "ttl"
+        return
+    threading.Thread(target=watch_changes, name="change-stream-watcher", daemon=True).start()
+
+
+@app.route('/api/vector-search')
+def search_route():
+    """
+    Simulare Vector Database Search
+    În producție, s-ar folosi MongoDB Atlas Vector Search sau Pinecone
+    Aici folosim un index in-process (VectorIndex): un matmul peste vectorii
+    pre-normalizati in loc de o bucla Python per document
+
+    Parametri:
+    ?vector=0.1,0.5,...  - vectorul cautat
+    ?moto_id=M105        - "motociclete similare cu aceasta"
+    ?k=5                 - numarul de rezultate
+    ?mode=exact|ivf|auto - auto foloseste IVF doar pentru cataloage mari
+    Fara vector/moto_id folosim un vector aleator (demo)
+    """
+    try:
+        vector_index.ensure_loaded()
+        args = request.args
+
+        try:
+            k = max(1, min(int(args.get('k', 5)), 100))
+        except ValueError:
+            return jsonify({"error": "Parametrul k trebuie sa fie numar"}), 400
+
+        exclude = None
+        if args.get('moto_id'):
+            query = vector_index.vector_for(args['moto_id'])
+            if query is None:
+                return jsonify({"error": f"Produsul {args['moto_id']} nu are embedding"}), 404
+            exclude = args['moto_id']
+        elif args.get('vector'):
+            try:
+                query = np.array([float(x) for x in args['vector'].split(',')], dtype=np.float32)
+            except ValueError:
+                return jsonify({"error": "Vector invalid"}), 400
+            if len(query) != vector_index.dim:
+                return jsonify({"error": f"Vectorul trebuie sa aiba {vector_index.dim} dimensiuni"}), 400
+        else:
+            query = np.random.rand(vector_index.dim)
+
+        mode = args.get('mode', 'auto')
+        if mode == 'auto':
+            approximate = vector_index.size >= VECTOR_IVF_MIN_SIZE
+        else:
+            approximate = mode == 'ivf'
+
+        results = [
+            {
+                "moto_id": meta['moto_id'],
+                "name": meta['name'],
+                "price": meta['price'],
+                "score": round(score * 100, 1)
+            }
+            for meta, score in vector_index.search(query, k, exclude=exclude, approximate=approximate)
+        ]
+        return jsonify(results)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# BENCHMARK - ruleaza pe o copie scratch, niciodata pe colectia live
+BENCH_COLLECTION = "bench_products"
+BENCH_MIN_DOCS = 10_000
+BENCH_MAX_DOCS = 10_000_000
+BENCH_CHUNK = 10_000
+
+
+def seed_bench_collection(coll, n, seed=42):
+    """
+    Populeaza colectia scratch cu n produse, generate vectorizat cu NumPy
+    si inserate in chunk-uri insert_many neordonate
+    """
+    coll.drop()
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, BENCH_CHUNK):
+        size = min(BENCH_CHUNK, n - start)
+        prices = rng.integers(5000, 20000, size)
+        brands = rng.integers(0, len(BRANDS), size)
+        stocks = rng.integers(0, 9, size)
+        coll.insert_many([
+            {
+                "moto_id": f"B{start + i}",
+                "price": int(prices[i]),
+                "brand": BRANDS[brands[i]],
+                "stock": int(stocks[i])
+            }
+            for i in range(size)
+        ], ordered=False)
+    coll.create_index("price")
+    coll.create_index("brand")
+    coll.create_index("moto_id", unique=True)
+
+
+def explain_summary(coll, query, hint):
+    """
+    explain("executionStats"): documente/chei examinate si planul castigator
+    hint vine ca lista (campuri, directie) pentru Cursor.hint(); comanda bruta
+    accepta doar document sau nume de index, deci il convertim in document
+    """
+    explain = db.command(
+        "explain",
+        {"find": coll.name, "filter": query, "hint": dict(hint)},
+        verbosity="executionStats"
+    )
+    stats = explain.get("executionStats", {})
+    return {
+        "plan": plan_stages(explain),
+        "n_returned": stats.get("nReturned"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "execution_ms": stats.get("executionTimeMillis")
+    }
+
+
+def time_query(coll, query, hint, runs, warmup):
+    """
+    Latente in ms (p50/p95/p99) masurate cu perf_counter_ns, dupa warm-up
+    Cronometram count_documents: serverul parcurge toate potrivirile pe calea
+    data de hint, dar intoarce un singur numar - masuram indexul vs collection
+    scan, nu transferul si decodarea BSON a sute de mii de documente.
+    """
+    for _ in range(warmup):
+        coll.count_documents(query, hint=hint)
+    samples = np.empty(runs, dtype=np.int64)
+    for i in range(runs):
+        start = time.perf_counter_ns()
+        coll.count_documents(query, hint=hint)
+        samples[i] = time.perf_counter_ns() - start
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) / 1e6
+    return {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3), "runs": runs}
+
+
+@app.route('/api/test-performance')
+def test_performance():
+    """
+    SCALING STRATEGY: Indexare
+    Comparăm query cu și fără index pe o colectie scratch (bench_products),
+    fara sa atingem indexurile colectiei products
+
+    Parametri: ?docs=10000 (10k - 10M) &runs=30 &warmup=3 &keep=1 (pastreaza colectia)
+    Fiecare query ruleaza cu hint pe index si cu hint $natural (collection scan)
+    """
+    try:
+        args = request.args
+        try:
+            n_docs = min(max(int(args.get('docs', BENCH_MIN_DOCS)), BENCH_MIN_DOCS), BENCH_MAX_DOCS)
+            runs = min(max(int(args.get('runs', 30)), 1), 1000)
+            warmup = min(max(int(args.get('warmup', 3)), 0), 100)
+        except ValueError:
+            return jsonify({"error": "Parametrii docs/runs/warmup trebuie sa fie numere"}), 400
+
+        coll = db[BENCH_COLLECTION]
+        seed_start = time.perf_counter()
+        if coll.estimated_document_count() != n_docs:
+            seed_bench_collection(coll, n_docs)
+        seed_time = round(time.perf_counter() - seed_start, 2)
+
+        queries = [
+            ("price > 18000", {"price": {"$gt": 18000}}, [("price", 1)]),
+            ("brand = Ducati", {"brand": "Ducati"}, [("brand", 1)]),
+            ("moto_id = B500", {"moto_id": "B500"}, [("moto_id", 1)]),
+        ]
+        results = []
+        for label, query, index_hint in queries:
+            with_index = time_query(coll, query, index_hint, runs, warmup)
+            without_index = time_query(coll, query, [("$natural", 1)], runs, warmup)
+            with_index["explain"] = explain_summary(coll, query, index_hint)
+            without_index["explain"] = explain_summary(coll, query, [("$natural", 1)])
+            results.append({
+                "query": label,
+                "with_index": with_index,
+                "without_index": without_index,
+                "improvement": round(without_index["p50"] / with_index["p50"], 1) if with_index["p50"] > 0 else 1
+            })
+
+        if args.get('keep') != '1':
+            coll.drop()
+
+        first = results[0]
+        return jsonify({
+            "docs": n_docs,
+            "seed_seconds": seed_time,
+            # Campurile vechi (query-ul pe pret, p50) pentru interfata web
+            "without_index": {"time": first["without_index"]["p50"], "count": first["without_index"]["explain"]["n_returned"]},
+            "with_index": {"time": first["with_index"]["p50"], "count": first["with_index"]["explain"]["n_returned"]},
+            "improvement": first["improvement"],
+            "queries": results
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/admin/slow-queries')
+def admin_slow_queries():
+    """
+    Comenzile lente grupate dupa forma: numar, durata totala/medie/maxima,
+    documente intoarse si rutele de origine. ?minutes= fereastra, ?limit=
+    """
+    try:
+        limit = min(int(request.args.get('limit', 20)), 200)
+        minutes = request.args.get('minutes')
+        since = datetime.now() - timedelta(minutes=float(minutes)) if minutes else None
+    except ValueError:
+        return jsonify({"error": "limit si minutes trebuie sa fie numere"}), 400
+
+    try:
+        pipeline = [
+            {"$match": {"ts": {"$gte": since}} if since else {}},
+            {"$group": {
+                "_id": "$shape_hash",
+                "command": {"$first": "$command"},
+                "collection": {"$first": "$collection"},
+                "shape": {"$first": "$shape"},
+                "count": {"$sum": 1},
+                "total_ms": {"$sum": "$duration_ms"},
+                "avg_ms": {"$avg": "$duration_ms"},
+                "max_ms": {"$max": "$duration_ms"},
+                "avg_docs": {"$avg": "$docs_returned"},
+                "routes": {"$addToSet": "$route"},
+                "last_seen": {"$max": "$ts"},
+                "explain": {"$max": "$explain"}
+            }},
+            {"$sort": {"total_ms": -1}},
+            {"$limit": limit}
+        ]
+        shapes = []
+        for row in db[SLOW_QUERY_COLLECTION].aggregate(pipeline):
+            row["shape_hash"] = row.pop("_id")
+            row["total_ms"] = round(row["total_ms"], 1)
+            row["avg_ms"] = round(row["avg_ms"], 1)
+            row["avg_docs"] = round(row["avg_docs"], 1) if row.get("avg_docs") is not None else None
+            shapes.append(row)
+        return jsonify({
+            "threshold_ms": slow_query_log.threshold_ms,
+            "explain": slow_query_log.explain,
+            "dropped": slow_query_log.dropped,
+            "shapes": shapes
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@app.route('/api/admin/pool')
+def admin_pool():
+    """
+    Statistici pool de conexiuni (evenimente CMAP) si configuratia clientului
+    """
+    options = mongo_client_options()
+    return jsonify({
+        "pool": pool_stats.snapshot(),
+        "config": {
+            "maxPoolSize": options["maxPoolSize"],
+            "minPoolSize": options["minPoolSize"],
+            "waitQueueTimeoutMS": options.get("waitQueueTimeoutMS"),
+            "compressors": options.get("compressors"),
+            "analytics_read_preference": ANALYTICS_READ_PREFERENCE
+        }
+    })
+
+@app.route('/api/admin/indexes')
+def admin_indexes():
+    """
+    Raport indexuri: definitie, daca este declarat in INDEX_REGISTRY si cat
+    este folosit ($indexStats - numar de accesari de la ultimul restart mongod)
+    missing: indexuri declarate care lipsesc; mismatched: exista un index cu
+    acelasi nume/cheie dar alta definitie (ex: fara unique)
+    ?apply=1 - reaplica registrul (recreeaza indexurile cu alta definitie)
+    """
+    try:
+        applied = ensure_indexes(rebuild=True) if request.args.get('apply') == '1' else None
+
+        report = {}
+        for coll_name, models in INDEX_REGISTRY.items():
+            existing = db[coll_name].index_information()
+            declared = [declared_definition(model) for model in models]
+            stats = {st["name"]: st for st in db[coll_name].aggregate([{"$indexStats": {}}])}
+            indexes = []
+            for name, info in existing.items():
+                usage = stats.get(name, {}).get("accesses", {})
+                indexes.append({
+                    "name": name,
+                    "key": info["key"],
+                    "unique": info.get("unique", False),
+                    # declarat = aceeasi cheie si acelasi unique ca in registru
+                    "declared": name == "_id_" or existing_definition(info) in declared,
+                    "ops": usage.get("ops"),
+                    "since": usage.get("since")
+                })
+
+            actual = [existing_definition(info) for info in existing.values()]
+            missing = []
+            mismatched = []
+            for model in models:
+                if declared_definition(model) in actual:
+                    continue
+                conflict = index_conflict(model, existing)
+                if conflict is None:
+                    missing.append(model.document["name"])
+                else:
+                    mismatched.append({
+                        "name": model.document["name"],
+                        "existing": conflict,
+                        "declared": {"key": model.document["key"], "unique": model.document.get("unique", False)},
+                        "actual": {"key": existing[conflict]["key"], "unique": existing[conflict].get("unique", False)}
+                    })
+            report[coll_name] = {
+                "indexes": indexes,
+                "missing": sorted(missing),
+                "mismatched": mismatched
+            }
+
+        if applied is not None:
+            report["applied"] = applied
+        return jsonify(report)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/aggregation')
+@cached_response("products", ttl=ANALYTICS_CACHE_TTL_SECONDS)
 def aggregation_pipeline():
     """
     AGGREGATION PIPELINE - Demonstrează capabilitățile MongoDB
@@ -1393,7 +3772,7 @@ def aggregation_pipeline():
             }
         ]
         
-        results = list(db.products.aggregate(pipeline))
+        results = list(analytics_db.products.aggregate(pipeline))
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1446,13 +3825,59 @@ def get_users():
     """
     CRUD: READ - Citim utilizatorii din MongoDB
     Demonstrează EMBEDDING pattern - adresa este stocată în document
+    Suporta streaming NDJSON (?stream=1) pentru colectii mari si ?fields=
     """
     try:
-        users = list(db.users.find({}, {'_id': 0}))
+        projection = list_projection("users", request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if wants_stream():
+            return stream_ndjson(db.users.find({}, projection))
+
+        users = list(db.users.find({}, projection))
         return jsonify(users)
     except Exception as e:
         return jsonify([])
 
+def next_sequence(name):
+    """
+    Aloca atomic urmatoarea valoare dintr-un contor (colectia counters)
+    Un singur find_one_and_update cu $inc - sigur la inregistrari concurente
+    """
+    counter = db.counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=pymongo.ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+
+def sync_user_id_counter():
+    """
+    Aduce contorul user_id la cel mai mare numar folosit (comparatie numerica,
+    nu pe string - "U9" > "U10" lexicografic)
+    """
+    result = list(db.users.aggregate([
+        {"$match": {"user_id": {"$regex": "^U[0-9]+$"}}},
+        {"$group": {"_id": None, "max": {"$max": {"$toInt": {"$substrCP": ["$user_id", 1, 18]}}}}}
+    ]))
+    if result:
+        db.counters.update_one({"_id": "user_id"}, {"$max": {"seq": result[0]["max"]}}, upsert=True)
+
+
+def duplicate_key_fields(error):
+    """
+    Campurile indexului unic care a generat DuplicateKeyError
+    """
+    details = error.details or {}
+    if details.get('keyPattern'):
+        return set(details['keyPattern'])
+    return {field for field in ("email", "user_id") if field in str(error)}
+
+
 @app.route('/api/users', methods=['POST'])
 def create_user():
     """
@@ -1489,38 +3914,40 @@ def create_user():
                 "message": "Eroare: Format email invalid!"
             }), 400
         
-        existing_email = db.users.find_one({"email": email})
-        if existing_email:
-            return jsonify({
-                "success": False,
-                "message": f"Eroare: Email-ul {email} este deja folosit!"
-            }), 400
-        
-        last_user = db.users.find_one(sort=[("user_id", -1)])
-        if last_user:
-            last_num = int(last_user['user_id'].replace('U', ''))
-            new_id = f"U{last_num + 1}"
-        else:
-            new_id = "U1"
-        
         addresses = data.get('addresses', [])
         if len(addresses) > 3:
             addresses = addresses[:3]  # Limitam la 3 adrese
         
         new_user = {
-            "user_id": new_id,
             "name": data['name'].strip(),
             "email": email,
             "addresses": addresses,  # Array de adrese embedded
             "created_at": datetime.now()
         }
         
-        db.users.insert_one(new_user)
+        # Emailul duplicat este detectat de indexul unic users.email (fara pre-citire)
+        for attempt in range(2):
+            new_user["user_id"] = f"U{next_sequence('user_id')}"
+            try:
+                db.users.insert_one(new_user)
+                invalidate_cache("users")
+                break
+            except pymongo.errors.DuplicateKeyError as e:
+                new_user.pop('_id', None)
+                if 'email' in duplicate_key_fields(e):
+                    return jsonify({
+                        "success": False,
+                        "message": f"Eroare: Email-ul {email} este deja folosit!"
+                    }), 400
+                # Contorul a ramas in urma user_id-urilor existente (DB vechi) - il resincronizam
+                sync_user_id_counter()
+        else:
+            return jsonify({"success": False, "message": "Eroare: Nu s-a putut aloca un ID!"})
         
         return jsonify({
             "success": True,
             "message": f"Utilizator {data['name']} adaugat cu succes!",
-            "user_id": new_id
+            "user_id": new_user["user_id"]
         })
     except Exception as e:
         return jsonify({"success": False, "message": f"Eroare: {str(e)}"})
@@ -1554,11 +3981,17 @@ def update_user(user_id):
                 "updated_at": datetime.now()
             }}
         )
+        invalidate_cache("users")
         
         return jsonify({
             "success": True,
             "message": f"Utilizator {user_id} actualizat cu succes!"
         })
+    except pymongo.errors.DuplicateKeyError:
+        return jsonify({
+            "success": False,
+            "message": f"Eroare: Email-ul {data['email']} este deja folosit!"
+        }), 400
     except Exception as e:
         return jsonify({"success": False, "message": f"Eroare: {str(e)}"})
 
@@ -1571,6 +4004,7 @@ def delete_user(user_id):
         result = db.users.delete_one({"user_id": user_id})
         
         if result.deleted_count > 0:
+            invalidate_cache("users")
             return jsonify({
                 "success": True,
                 "message": f"Utilizator {user_id} sters!"
@@ -1590,62 +4024,233 @@ def get_orders():
     Demonstrează SNAPSHOT pattern - prețul este salvat la momentul comenzii
     """
     try:
-        orders = list(db.orders.find({}, {'_id': 0}).sort('date', -1).limit(10))
+        projection = list_projection("orders", request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        orders = list(db.orders.find({}, projection).sort('date', -1).limit(10))
         return jsonify(orders)
     except Exception as e:
         return jsonify([])
 
+@app.route('/api/orders/<order_code>')
+def get_order(order_code):
+    """
+    CRUD: READ - Cautare comanda dupa cod (point read pe indexul unic order_code)
+    """
+    try:
+        order = db.orders.find_one({"order_code": order_code}, {'_id': 0})
+        if order is None:
+            return jsonify({"error": f"Comanda {order_code} nu a fost gasita!"}), 404
+        return jsonify(order)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/admin/sales-rollup', methods=['POST'])
+def backfill_sales_route():
+    """
+    Job de backfill: reconstruieste sales_daily din comenzile existente
+    """
+    try:
+        start = time.perf_counter()
+        rows = backfill_sales_daily()
+        invalidate_cache("orders")
+        return jsonify({
+            "status": "ok",
+            "rows": rows,
+            "seconds": round(time.perf_counter() - start, 2)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+TOP_SALES_DEFAULT = 5
+TOP_SALES_MAX = 100
+
+
 @app.route('/api/top-sales')
+@cached_response("orders", ttl=ANALYTICS_CACHE_TTL_SECONDS)
 def top_sales():
     """
     Aggregation Pipeline pentru a găsi cele mai vândute produse
-    Folosește $lookup pentru a face JOIN între orders și products
+    Folosește $lookup pentru a face JOIN între orders și products - doar pe
+    top-k-ul final, nu pe tot rezultatul grupat
+
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD - zile intregi, citite din rollup-ul sales_daily
+    ?since=&until= (ISO 8601)      - interval exact, $match pe orders care
+                                     foloseste indexul compus {date, moto_id}
+    ?limit=5&brand=Ducati
     """
     try:
+        args = request.args
+        try:
+            limit = min(max(int(args.get('limit', TOP_SALES_DEFAULT)), 1), TOP_SALES_MAX)
+            if args.get('since') or args.get('until'):
+                source = analytics_db.orders
+                date_filter = {}
+                if args.get('since'):
+                    date_filter["$gte"] = datetime.fromisoformat(args['since'])
+                if args.get('until'):
+                    date_filter["$lt"] = datetime.fromisoformat(args['until'])
+                match = {"date": date_filter}
+                count_expr, revenue_expr = 1, "$price_snapshot"
+            else:
+                source = analytics_db.sales_daily
+                match = parse_day_range(args)
+                count_expr, revenue_expr = "$orders_count", "$revenue"
+        except ValueError:
+            return jsonify({"error": "Parametri invalizi (limit numar, date YYYY-MM-DD / ISO 8601)"}), 400
+
+        if args.get('brand'):
+            # Filtrul pe brand devine un $in pe moto_id (indexul products.brand),
+            # ca $match-ul sa ramana primul stagiu
+            match["moto_id"] = {"$in": analytics_db.products.distinct("moto_id", {"brand": args['brand']})}
+
         pipeline = [
+            {"$match": match},
             {
                 "$group": {
                     "_id": "$moto_id",
-                    "times_sold": {"$sum": 1},
-                    "total_revenue": {"$sum": "$price_snapshot"}
+                    "times_sold": {"$sum": count_expr},
+                    "total_revenue": {"$sum": revenue_expr}
+                }
+            },
+            {"$sort": {"times_sold": -1, "_id": 1}},
+            {"$limit": limit},
+            {
+                "$lookup": {
+                    "from": "products",
+                    "localField": "_id",
+                    "foreignField": "moto_id",
+                    "pipeline": [{"$project": {"_id": 0, "name": 1, "brand": 1}}],
+                    "as": "product"
                 }
             },
-            {"$sort": {"times_sold": -1}},
-            {"$limit": 5}
+            {"$unwind": {"path": "$product", "preserveNullAndEmptyArrays": True}},
+            {
+                "$project": {
+                    "_id": 1,
+                    "times_sold": 1,
+                    "total_revenue": 1,
+                    "name": "$product.name",
+                    "brand": "$product.brand"
+                }
+            }
         ]
         
-        results = list(db.orders.aggregate(pipeline))
+        results = list(source.aggregate(pipeline))
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/monthly-stats')
+@cached_response("orders", ttl=ANALYTICS_CACHE_TTL_SECONDS)
 def monthly_stats():
     """
     Aggregation pentru statistici pe perioade de timp
-    Grupare după an-lună
+    Grupare după an-lună peste rollup-ul zilnic sales_daily - costul depinde de
+    numarul de zile x produse vandute, nu de numarul de comenzi
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD
     """
     try:
+        try:
+            match = parse_day_range(request.args)
+        except ValueError:
+            return jsonify({"error": "Format data invalid (YYYY-MM-DD)"}), 400
+
         pipeline = [
+            {"$match": match},
             {
                 "$group": {
                     "_id": {
-                        "year": {"$year": "$date"},
-                        "month": {"$month": "$date"}
+                        "year": {"$year": "$day"},
+                        "month": {"$month": "$day"}
                     },
-                    "orders_count": {"$sum": 1},
-                    "revenue": {"$sum": "$price_snapshot"}
+                    "orders_count": {"$sum": "$orders_count"},
+                    "revenue": {"$sum": "$revenue"}
                 }
             },
             {"$sort": {"_id.year": -1, "_id.month": -1}}
         ]
         
-        results = list(db.orders.aggregate(pipeline))
+        results = list(analytics_db.sales_daily.aggregate(pipeline))
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# STARTUP - application factory (gunicorn "app:create_app()")
+startup_status = {"started": False, "indexes": None, "migrations": None, "error": None}
+startup_lock = threading.Lock()
+
+
+STARTUP_RETRY_SECONDS = 5
+
+
+def startup_tasks():
+    """
+    Migrari (o singura data, sub lock) + indexurile lipsa + change streams
+    Migrarile ruleaza primele: pot curata date care ar bloca un index unic.
+    Ruleaza pe un thread de fundal: nu blocheaza pornirea workerului.
+    Daca MongoDB nu e disponibil, reincercam pana devine disponibil.
+    """
+    while True:
+        try:
+            startup_status["migrations"] = run_migrations()
+            report = ensure_indexes()
+            startup_status["indexes"] = "ok" if all(e["status"] == "ok" for e in report) else report
+            startup_status["error"] = None
+            start_change_watcher()
+            print("✅ Conectat la MongoDB!")
+            return
+        except Exception as e:
+            startup_status["error"] = str(e)
+            print(f"⚠️ ATENȚIE: Nu s-a putut conecta la MongoDB: {e}")
+            time.sleep(STARTUP_RETRY_SECONDS)
+
+
+def create_app():
+    """
+    Porneste sarcinile de startup o singura data per proces si intoarce aplicatia
+    """
+    with startup_lock:
+        if not startup_status["started"]:
+            startup_status["started"] = True
+            threading.Thread(target=startup_tasks, name="startup", daemon=True).start()
+    return app
+
+
+@app.cli.command("migrate")
+@click.option("--dry-run", is_flag=True, help="Doar raporteaza documentele afectate")
+@click.option("--force", is_flag=True, help="Reruleaza migrarile deja aplicate")
+def migrate_command(dry_run, force):
+    """
+    flask --app app migrate - indexuri + migrari rulate explicit (fara server)
+    """
+    for name, status in run_migrations(force=force, dry_run=dry_run).items():
+        print(f"migrare {name}: {status}")
+    if not dry_run:
+        for entry in ensure_indexes(rebuild=True):
+            print(f"index {entry['collection']}.{entry['name']}: {entry['status']}")
+
+
+@app.route('/api/health/live')
+def health_live():
+    return jsonify({"status": "ok"})
+
+
+@app.route('/api/health/ready')
+def health_ready():
+    """
+    Readiness: MongoDB raspunde la ping (503 altfel) + starea sarcinilor de startup
+    """
+    try:
+        client.admin.command('ping')
+        return jsonify({"status": "ready", "startup": startup_status})
+    except Exception as e:
+        return jsonify({"status": "unavailable", "error": str(e), "startup": startup_status}), 503
+
+
 if __name__ == '__main__':
     print("🌍 Serverul Web pornește...")
     print("👉 Deschide browserul la adresa: http://127.0.0.1:5000")
-    app.run(port=5000)
\ No newline at end of file
+    create_app().run(port=5000)
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Mod de servire ASYNC (ASGI) pentru dashboard
+
+Rutele citite la fiecare incarcare a dashboard-ului (/api/stats, /api/products,
+/api/users, /api/orders) ruleaza ca view-uri async (Quart) pe un client MongoDB
+async, deci un singur worker tine deschise sute de cereri concurente fara sa
+blocheze un thread pe fiecare round-trip. Restul rutelor sunt servite de
+aplicatia Flask din app.py, adaptata la ASGI cu WsgiToAsgi.
+
+Instalare:  pip install quart asgiref uvicorn   (pymongo >= 4.10 sau motor)
+Rulare:     uvicorn asgi_app:asgi --port 5000
+"""
+import asyncio
+import inspect
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, jsonify, request
+
+import app as sync_app
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:
+    from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+
+
+quart_app = Quart(__name__)
+# Acelasi provider JSON ca in app.py (orjson, datetime ISO 8601), altfel Quart
+# ar serializa datele ca HTTP-date si rutele async ar diferi de cele Flask
+quart_app.json = sync_app.FastJSONProvider(quart_app)
+async_db = None
+
+ASYNC_ROUTES = {"/api/stats", "/api/products", "/api/users", "/api/orders"}
+
+
+@quart_app.before_serving
+async def connect():
+    """
+    Clientul async se creeaza pe event loop-ul serverului (Motor se leaga de loop)
+    """
+    global async_db
+    # Aceleasi listener-e ca clientul sync: pool, durata comenzilor, slow query log
+    client = AsyncMongoClient(
+        sync_app.MONGO_URI, event_listeners=[sync_app.pool_stats, sync_app.command_metrics],
+        **sync_app.mongo_client_options()
+    )
+    async_db = client[sync_app.DB_NAME]
+
+
+async def aggregate_list(coll, pipeline):
+    """
+    PyMongo async intoarce cursorul dintr-o corutina, Motor direct
+    """
+    cursor = coll.aggregate(pipeline)
+    if inspect.isawaitable(cursor):
+        cursor = await cursor
+    return await cursor.to_list(None)
+
+
+async def rebuild_stats():
+    """
+    Varianta async a rebuild_stats(): cele patru valori independente
+    (numar si suma pe orders, numar si suma pe products) se cer in paralel
+    """
+    product_count, order_count, revenue, price_sum = await asyncio.gather(
+        async_db.products.count_documents({}),
+        async_db.orders.count_documents({}),
+        aggregate_list(async_db.orders, [{"$group": {"_id": None, "total": {"$sum": "$price_snapshot"}}}]),
+        aggregate_list(async_db.products, [{"$group": {"_id": None, "total": {"$sum": "$price"}}}])
+    )
+    totals = {
+        "total_orders": order_count,
+        "total_revenue": revenue[0]["total"] if revenue else 0,
+        "total_products": product_count,
+        "price_sum": price_sum[0]["total"] if price_sum else 0,
+        "rebuilt_at": datetime.now()
+    }
+    await async_db.shop_stats.replace_one({"_id": sync_app.STATS_DOC_ID}, totals, upsert=True)
+    return totals
+
+
+@quart_app.route('/api/stats')
+async def get_stats():
+    """
+    Acelasi contract ca app.get_stats(): point read pe shop_stats, ?rebuild=1
+    """
+    try:
+        if request.args.get('rebuild') == '1':
+            totals = await rebuild_stats()
+            sync_app.invalidate_cache("orders", "products")
+        else:
+            totals = await async_db.shop_stats.find_one({"_id": sync_app.STATS_DOC_ID})
+            if totals is None:
+                totals = await rebuild_stats()
+
+        total_products = totals.get("total_products", 0)
+        price_sum = totals.get("price_sum", 0)
+        return jsonify({
+            "total_products": total_products,
+            "total_orders": totals.get("total_orders", 0),
+            "total_revenue": totals.get("total_revenue", 0),
+            "avg_price": round(price_sum / total_products, 0) if total_products else 0
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@quart_app.route('/api/products')
+async def get_products():
+    """
+    Paginare keyset - aceiasi parametri ca app.get_products() (fara streaming), inclusiv ?fields=
+    """
+    try:
+        try:
+            query, sort, limit = sync_app.parse_products_query(request.args)
+            projection = sync_app.list_projection(
+                "products", request.args, [field for field, _ in sync_app.PRODUCT_SORTS[sort]]
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        prods = await (
+            async_db.products.find(query, projection)
+            .sort(sync_app.PRODUCT_SORTS[sort])
+            .limit(limit + 1)
+            .to_list(None)
+        )
+        return jsonify(sync_app.products_page(prods, sort, limit))
+    except Exception as e:
+        return jsonify({"error": "Eroare la citirea produselor", "details": str(e)}), 500
+
+
+@quart_app.route('/api/users')
+async def get_users():
+    try:
+        projection = sync_app.list_projection("users", request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        users = await async_db.users.find({}, projection).to_list(None)
+        return jsonify(users)
+    except Exception:
+        return jsonify([])
+
+
+@quart_app.route('/api/orders')
+async def get_orders():
+    try:
+        projection = sync_app.list_projection("orders", request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        orders = await async_db.orders.find({}, projection).sort('date', -1).limit(10).to_list(None)
+        return jsonify(orders)
+    except Exception:
+        return jsonify([])
+
+
+@quart_app.before_request
+async def start_request_timer():
+    """
+    Aceleasi metrici per ruta ca in app.py (latenta, in-flight, erori, timp MongoDB)
+    """
+    sync_app.begin_request_metrics(request.url_rule.rule if request.url_rule else "unmatched")
+
+
+@quart_app.after_request
+async def record_request_metrics(response):
+    sync_app.record_response_metrics(request.method, response)
+    return response
+
+
+@quart_app.teardown_request
+async def end_request_timer(error):
+    sync_app.end_request_metrics(request.method, error)
+
+
+@quart_app.after_request
+async def compress_response(response):
+    """
+    Aceeasi negociere (br > zstd > gzip) si acelasi prag ca app.compress_response;
+    rutele Quart nu trec prin hook-urile Flask
+    """
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in sync_app.COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = sync_app.negotiate_encoding(sync_app.COMPRESSORS, request.accept_encodings)
+    if encoding == "identity":
+        return response
+
+    compressed = sync_app.compress_body(await response.get_data(), encoding)
+    if compressed is None:
+        return response
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+flask_asgi = WsgiToAsgi(sync_app.create_app())
+
+
+def wants_stream(scope):
+    """
+    Streaming-ul NDJSON (?stream=1 / Accept: application/x-ndjson) ramane pe Flask
+    """
+    if b"stream=1" in scope.get("query_string", b""):
+        return True
+    return any(name == b"accept" and b"application/x-ndjson" in value for name, value in scope["headers"])
+
+
+async def asgi(scope, receive, send):
+    """
+    Dispecer ASGI: rutele de dashboard (GET) pe Quart, restul pe Flask
+    """
+    if scope["type"] == "lifespan":
+        await quart_app(scope, receive, send)
+    elif scope["type"] == "http" and scope["path"] in ASYNC_ROUTES and scope["method"] == "GET" \
+            and not wants_stream(scope):
+        await quart_app(scope, receive, send)
+    else:
+        await flask_asgi(scope, receive, send)
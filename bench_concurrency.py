@@ -0,0 +1,102 @@
+"""
+Masurare capacitate la conexiuni concurente: mod sync (Flask) vs async (ASGI)
+
+Trimite cereri GET catre endpoint-urile dashboard-ului, cu N conexiuni
+deschise simultan, si raporteaza throughput-ul si latentele p50/p95/p99.
+Foloseste doar biblioteca standard, deci poate rula contra oricarui server:
+
+    python app.py                                  # sync, port 5000
+    uvicorn asgi_app:asgi --port 5001              # async
+    python bench_concurrency.py http://127.0.0.1:5000 --concurrency 200
+    python bench_concurrency.py http://127.0.0.1:5001 --concurrency 200
+
+Encoder JSON (orjson vs json standard) pe listele mari:
+
+    python app.py                                  # orjson, daca e instalat
+    MOTO_JSON_ENCODER=std python app.py            # json standard
+    python bench_concurrency.py http://127.0.0.1:5000 --paths "/api/products?limit=200" /api/users
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+DASHBOARD_PATHS = ["/api/stats", "/api/products", "/api/users", "/api/orders"]
+
+
+async def fetch(host, port, path, timeout):
+    """
+    O cerere HTTP/1.1 pe o conexiune noua; intoarce (status, latenta in ms)
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status = int(status_line.split()[1]) if status_line else 0
+    return status, (time.perf_counter() - start) * 1000
+
+
+async def run(base_url, concurrency, total, timeout, paths=DASHBOARD_PATHS):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            path = paths[i % len(paths)]
+            try:
+                status, latency = await fetch(host, port, path, timeout)
+                if status == 200:
+                    latencies.append(latency)
+                else:
+                    errors += 1
+            except (OSError, asyncio.TimeoutError):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "req_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else None,
+        "p95_ms": round(percentile(0.95), 1) if latencies else None,
+        "p99_ms": round(percentile(0.99), 1) if latencies else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base_url")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--paths", nargs="+", default=DASHBOARD_PATHS)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.base_url, args.concurrency, args.requests, args.timeout, args.paths))
+    for key, value in result.items():
+        print(f"{key:>12}: {value}")
+
+
+if __name__ == '__main__':
+    main()
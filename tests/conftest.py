@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("MOTO_CHANGE_STREAMS", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def appmod():
+    # MongoClient e creat cu connect=False: importul nu deschide conexiuni
+    import app
+    return app
+
+
+@pytest.fixture
+def mock_db(appmod, monkeypatch):
+    """
+    Baza de date in memorie (mongomock) in locul celei reale
+    """
+    mongomock = pytest.importorskip("mongomock")
+    database = mongomock.MongoClient()[appmod.DB_NAME]
+    monkeypatch.setattr(appmod, "db", database)
+    appmod.invalidate_cache("orders", "products")
+    return database
+
+
+@pytest.fixture
+def client(appmod, mock_db):
+    appmod.app.config["TESTING"] = True
+    return appmod.app.test_client()
@@ -0,0 +1,57 @@
+def seed_products(db, **stock):
+    db.products.insert_many([
+        {"moto_id": moto_id, "name": f"Produs {moto_id}", "price": 100, "stock": qty}
+        for moto_id, qty in stock.items()
+    ])
+
+
+def stock_of(db, moto_id):
+    return db.products.find_one({"moto_id": moto_id})["stock"]
+
+
+def test_batch_checkout(client, mock_db):
+    seed_products(mock_db, M1=5, M2=1)
+    r = client.post("/api/buy/batch", json={"items": [
+        {"moto_id": "M1", "qty": 2}, {"moto_id": "M2", "qty": 3}, {"moto_id": "MX", "qty": 1},
+    ]})
+    body = r.get_json()
+    assert [line["success"] for line in body["lines"]] == [True, False, False]
+    assert body["orders_count"] == 2
+    assert stock_of(mock_db, "M1") == 3
+    assert stock_of(mock_db, "M2") == 1
+    assert mock_db.orders.count_documents({}) == 2
+
+
+def test_interleaved_checkouts_keep_stock_and_orders_consistent(client, mock_db, monkeypatch):
+    """
+    Checkout-ul B ruleaza complet intre bulk_write-ul lui A si citirea inapoi
+    a marcajelor: A nu trebuie sa-si piarda liniile decrementate
+    """
+    seed_products(mock_db, M1=10, M2=1)
+    bulk_write = mock_db.products.bulk_write
+    interleaved = []
+
+    def racy_bulk_write(ops, **kwargs):
+        if interleaved:
+            return bulk_write(ops, **kwargs)
+        interleaved.append(True)
+        # Stocul lui M2 dispare intre citire si scriere: A primeste matched_count scurt
+        mock_db.products.update_one({"moto_id": "M2"}, {"$set": {"stock": 0}})
+        result = bulk_write(ops, **kwargs)
+        r = client.post("/api/buy/batch", json={"items": [{"moto_id": "M1", "qty": 1}]})
+        interleaved.append(r.get_json())
+        return result
+
+    monkeypatch.setattr(mock_db.products, "bulk_write", racy_bulk_write)
+    first = client.post("/api/buy/batch", json={"items": [
+        {"moto_id": "M1", "qty": 2}, {"moto_id": "M2", "qty": 1},
+    ]}).get_json()
+    second = interleaved[1]
+
+    assert [line["success"] for line in first["lines"]] == [True, False]
+    assert [line["success"] for line in second["lines"]] == [True]
+    # Fiecare bucata scazuta din stoc are exact o comanda
+    assert stock_of(mock_db, "M1") == 10 - 3
+    assert mock_db.orders.count_documents({"moto_id": "M1"}) == 3
+    assert mock_db.orders.count_documents({"moto_id": "M2"}) == 0
+    assert mock_db.products.count_documents({"pending_checkouts.0": {"$exists": True}}) == 0
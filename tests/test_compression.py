@@ -0,0 +1,63 @@
+import zlib
+
+import pytest
+
+DECOMPRESS = {
+    "gzip": lambda data: zlib.decompress(data, 31),
+    "br": lambda data: pytest.importorskip("brotli").decompress(data),
+    "zstd": lambda data: pytest.importorskip("zstandard").ZstdDecompressor().decompressobj().decompress(data),
+}
+
+
+def ndjson_lines(count):
+    return [b'{"moto_id":"M%d","name":"Produs %d","price":%d}\n' % (i, i, i * 10) for i in range(count)]
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_stream_roundtrip(appmod, encoding):
+    if encoding not in appmod.COMPRESSORS:
+        pytest.skip(f"{encoding} nu este instalat")
+    lines = ndjson_lines(1200)
+    compressed = b"".join(appmod.compress_stream(iter(lines), encoding))
+    assert DECOMPRESS[encoding](compressed) == b"".join(lines)
+
+
+@pytest.fixture
+def flushes(appmod, monkeypatch):
+    calls = []
+    gzip_compressor = appmod.COMPRESSORS["gzip"]
+
+    def counting_gzip():
+        compress, flush, finish = gzip_compressor()
+
+        def counted_flush():
+            calls.append(1)
+            return flush()
+        return compress, counted_flush, finish
+
+    monkeypatch.setitem(appmod.COMPRESSORS, "gzip", counting_gzip)
+    return calls
+
+
+def test_stream_flushes_per_batch_not_per_line(appmod, flushes):
+    lines = ndjson_lines(2 * appmod.STREAM_BATCH_SIZE + 10)
+    compressed = b"".join(appmod.compress_stream(iter(lines), "gzip"))
+    assert len(flushes) == 2
+    assert zlib.decompress(compressed, 31) == b"".join(lines)
+
+
+def test_stream_flushes_after_flush_bytes(appmod, flushes):
+    chunk = b"x" * (appmod.STREAM_FLUSH_BYTES // 2 + 1)
+    list(appmod.compress_stream(iter([chunk] * 5), "gzip"))
+    assert len(flushes) == 2
+
+
+def test_stream_accepts_str_chunks(appmod):
+    compressed = b"".join(appmod.compress_stream(iter(["a\n", "b\n"]), "gzip"))
+    assert zlib.decompress(compressed, 31) == b"a\nb\n"
+
+
+def test_body_under_threshold_is_not_compressed(appmod):
+    assert appmod.compress_body(b"x" * (appmod.COMPRESS_MIN_BYTES - 1), "gzip") is None
+    body = b"x" * appmod.COMPRESS_MIN_BYTES
+    assert zlib.decompress(appmod.compress_body(body, "gzip"), 31) == body
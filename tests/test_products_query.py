@@ -0,0 +1,70 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+
+def parse(appmod, **args):
+    return appmod.parse_products_query(MultiDict(args))
+
+
+def test_defaults(appmod):
+    assert parse(appmod) == ({}, "moto_id", appmod.PRODUCTS_PAGE_DEFAULT)
+
+
+def test_filters_and_limit_clamp(appmod):
+    query, sort, limit = parse(appmod, brand="Honda", type="Sport", min_price="1000", max_price="2500.5",
+                               sort="-price", limit="100000")
+    assert query == {"brand": "Honda", "type": "Sport", "price": {"$gte": 1000, "$lte": 2500.5}}
+    assert sort == "-price"
+    assert limit == appmod.PRODUCTS_PAGE_MAX
+    assert parse(appmod, limit="0")[2] == 1
+
+
+@pytest.mark.parametrize("args", [
+    {"sort": "name"},
+    {"limit": "zece"},
+    {"min_price": "ieftin"},
+    {"sort": "price", "after": "M100"},
+    {"sort": "price", "after": "abc|M100"},
+])
+def test_invalid_parameters(appmod, args):
+    with pytest.raises(ValueError):
+        parse(appmod, **args)
+
+
+def test_keyset_condition(appmod):
+    assert appmod.keyset_condition("M105", "moto_id") == {"moto_id": {"$gt": "M105"}}
+    assert appmod.keyset_condition("15000|M105", "price") == {"$or": [
+        {"price": {"$gt": 15000}},
+        {"price": 15000, "moto_id": {"$gt": "M105"}},
+    ]}
+    assert appmod.keyset_condition("15000.5|M105", "-price") == {"$or": [
+        {"price": {"$lt": 15000.5}},
+        {"price": 15000.5, "moto_id": {"$lt": "M105"}},
+    ]}
+
+
+@pytest.mark.parametrize("sort", ["moto_id", "price", "-price"])
+def test_keyset_pages_cover_every_product_once(appmod, client, mock_db, sort):
+    # Preturi repetate: cursorul trebuie sa continue corect in interiorul unui pret
+    mock_db.products.insert_many([
+        {"moto_id": f"M{100 + i}", "name": f"Produs {i}", "brand": "Honda", "type": "Sport",
+         "price": 1000 * (i % 4), "stock": 1}
+        for i in range(23)
+    ])
+    seen = []
+    after = None
+    while True:
+        params = {"sort": sort, "limit": 5}
+        if after:
+            params["after"] = after
+        page = client.get("/api/products", query_string=params).get_json()
+        seen.extend(p["moto_id"] for p in page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    fields = [field for field, _ in appmod.PRODUCT_SORTS[sort]]
+    expected = [p["moto_id"] for p in sorted(
+        mock_db.products.find(), key=lambda p: [p[field] for field in fields], reverse=sort.startswith("-")
+    )]
+    assert seen == expected
@@ -0,0 +1,30 @@
+def test_literals_become_placeholders(appmod):
+    assert appmod.query_shape({"price": {"$gt": 10000}, "brand": "Honda"}) == {
+        "price": {"$gt": "?"}, "brand": "?"
+    }
+
+
+def test_lists_collapse_to_distinct_shapes(appmod):
+    assert appmod.query_shape({"moto_id": {"$in": ["M1", "M2", "M3"]}}) == {"moto_id": {"$in": ["?"]}}
+    assert appmod.query_shape({"$or": [{"price": 1}, {"price": 2}, {"brand": "x"}]}) == {
+        "$or": [{"price": "?"}, {"brand": "?"}]
+    }
+
+
+def test_field_references_are_kept(appmod):
+    pipeline = [
+        {"$match": {"date": {"$gte": "2024-01-01"}}},
+        {"$group": {"_id": "$moto_id", "total": {"$sum": "$price_snapshot"}, "n": {"$sum": 1}}},
+        {"$limit": 10},
+    ]
+    assert appmod.query_shape(pipeline) == [
+        {"$match": {"date": {"$gte": "?"}}},
+        {"$group": {"_id": "$moto_id", "total": {"$sum": "$price_snapshot"}, "n": {"$sum": "?"}}},
+        {"$limit": "?"},
+    ]
+
+
+def test_same_shape_for_different_values(appmod):
+    first = appmod.query_shape({"price": {"$gt": 1}, "moto_id": {"$in": ["M1"]}})
+    second = appmod.query_shape({"price": {"$gt": 99999}, "moto_id": {"$in": ["M7", "M8"]}})
+    assert first == second
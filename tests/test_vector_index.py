@@ -0,0 +1,161 @@
+import time
+
+import numpy as np
+import pytest
+
+DIM = 8
+
+
+@pytest.fixture
+def make_index(appmod):
+    def make(rows, seed=0):
+        rng = np.random.default_rng(seed)
+        index = appmod.VectorIndex(dim=DIM)
+        index.upsert([
+            {"moto_id": f"M{i}", "name": f"Produs {i}", "price": i, "vector_embedding": rng.normal(size=DIM).tolist()}
+            for i in range(rows)
+        ])
+        return index
+    return make
+
+
+def wait_for_ivf(index, timeout=10):
+    deadline = time.monotonic() + timeout
+    while index.ivf_building:
+        assert time.monotonic() < deadline, "clusterizarea IVF nu s-a terminat"
+        time.sleep(0.01)
+
+
+def build_ivf(index):
+    with index.lock:
+        index._start_ivf_build()
+    wait_for_ivf(index)
+
+
+def assert_lists_consistent(index, changed=()):
+    # Randurile schimbate sunt in lista centroidului cel mai apropiat, iar
+    # listele IVF acopera fiecare rand exact o data
+    rows = np.asarray([index.positions[moto_id] for moto_id in changed], dtype=np.int64)
+    if len(rows):
+        nearest = np.argmax(index.vectors[rows] @ index.centroids.T, axis=1)
+        assert np.array_equal(index.assign[rows], nearest)
+    for i in list(index.dirty_lists):
+        index.ivf_lists[i] = np.flatnonzero(index.assign[:index.size] == i)
+    rows = np.sort(np.concatenate(index.ivf_lists))
+    assert np.array_equal(rows, np.arange(index.size))
+    for i, members in enumerate(index.ivf_lists):
+        assert (index.assign[members] == i).all()
+
+
+def test_exact_search_ranks_by_cosine(make_index):
+    index = make_index(50)
+    query = index.vector_for("M7")
+    results = index.search(query, k=3)
+    assert results[0][0]["moto_id"] == "M7"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_exclude_and_k_larger_than_rows(make_index):
+    index = make_index(3)
+    query = index.vector_for("M1")
+    assert len(index.search(query, k=10)) == 3
+    results = index.search(query, k=10, exclude="M1")
+    assert [meta["moto_id"] for meta, _ in results].count("M1") == 0
+    assert len(results) == 2
+
+
+def test_empty_index(appmod):
+    assert appmod.VectorIndex(dim=DIM).search(np.ones(DIM), k=5) == []
+
+
+def test_upsert_updates_in_place_and_grows(make_index):
+    index = make_index(1500)
+    assert index.size == 1500 and len(index.vectors) >= 1500
+    new_vector = np.ones(DIM)
+    index.upsert([{"moto_id": "M3", "name": "Nou", "price": 1, "vector_embedding": new_vector.tolist()}])
+    assert index.size == 1500
+    assert index.search(new_vector, k=1)[0][0] == {"moto_id": "M3", "name": "Nou", "price": 1}
+
+
+def test_upsert_skips_wrong_dimension(make_index):
+    index = make_index(5)
+    index.upsert([{"moto_id": "MX", "vector_embedding": [1.0, 2.0]}])
+    assert index.size == 5
+
+
+def test_first_approximate_search_falls_back_to_exact(make_index):
+    index = make_index(100)
+    query = index.vector_for("M5")
+    assert index.search(query, k=1, approximate=True)[0][0]["moto_id"] == "M5"
+    wait_for_ivf(index)
+    assert index.centroids is not None
+    assert_lists_consistent(index)
+
+
+def test_incremental_reassign_after_ivf_build(make_index):
+    index = make_index(400)
+    build_ivf(index)
+    rng = np.random.default_rng(1)
+    added = [
+        {"moto_id": f"N{i}", "name": "Nou", "price": 0, "vector_embedding": rng.normal(size=DIM).tolist()}
+        for i in range(10)
+    ]
+    index.upsert(added)
+    assert index.ivf_changes == 10
+    assert index.dirty_lists
+    for product in added:
+        top = index.search(product["vector_embedding"], k=1, approximate=True)
+        assert top[0][0]["moto_id"] == product["moto_id"]
+    assert_lists_consistent(index, [product["moto_id"] for product in added])
+
+
+def test_rows_changed_during_ivf_build_are_merged(make_index):
+    index = make_index(300)
+    # Pornim clusterizarea "manual", pe acelasi instantaneu ca _start_ivf_build
+    with index.lock:
+        index.ivf_building = True
+        index.ivf_touched = set()
+        data = index.vectors[:index.size].copy()
+        generation = index.generation
+    rng = np.random.default_rng(2)
+    index.upsert([{"moto_id": "M0", "name": "Mutat", "price": 0, "vector_embedding": rng.normal(size=DIM).tolist()}])
+    index.upsert([
+        {"moto_id": f"N{i}", "name": "Nou", "price": 0, "vector_embedding": rng.normal(size=DIM).tolist()}
+        for i in range(20)
+    ])
+    index._build_ivf(data, generation)
+
+    assert not index.ivf_building and index.ivf_touched is None
+    assert index.size == 320
+    assert_lists_consistent(index, ["M0"] + [f"N{i}" for i in range(20)])
+
+
+def test_ivf_build_discarded_after_reload(make_index):
+    index = make_index(100)
+    with index.lock:
+        index.ivf_building = True
+        index.ivf_touched = set()
+        data = index.vectors[:index.size].copy()
+        generation = index.generation
+        index._clear()
+    index._build_ivf(data, generation)
+    assert index.centroids is None
+    assert not index.ivf_building
+
+
+def test_many_changes_trigger_background_rebuild(appmod, make_index):
+    index = make_index(200)
+    build_ivf(index)
+    first = index.centroids
+    rng = np.random.default_rng(3)
+    changed = int(appmod.VECTOR_IVF_REBUILD_FRACTION * index.size) + 1
+    index.upsert([
+        {"moto_id": f"M{i}", "name": "Mutat", "price": 0, "vector_embedding": rng.normal(size=DIM).tolist()}
+        for i in range(changed)
+    ])
+    wait_for_ivf(index)
+    assert index.centroids is not first
+    assert index.ivf_changes == 0
+    assert_lists_consistent(index)